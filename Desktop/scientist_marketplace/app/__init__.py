@@ -1,4 +1,5 @@
 from flask import Flask, redirect, url_for
+from app import db_routing
 from app.extensions import db, migrate
 from config import Config  # This pulls in .env settings
 
@@ -6,10 +7,33 @@ def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)  # Load config from .env via config.py
 
+    db_routing.configure(app)
     db.init_app(app)
-    migrate.init_app(app, db)
 
     from app import models  # Must come after db.init_app()
+    from app import assistant, catalog, chat_log, fragments, instrumentation, llm, serving
+    from app import notifications  # Registers the background job tasks
+    from app.catalog_io import catalog_cli
+    from app.jobs import jobs_cli
+    from app.products import products_cli
+    from app.query_plans import plans_cli
+    from app.request_stats import stats_cli
+    from app.search import include_object, search_cli
+
+    migrate.init_app(app, db, include_object=include_object)
+    catalog.init_app(app)
+    fragments.init_app(app)
+    llm.init_app(app)
+    assistant.init_app(app)
+    chat_log.init_app(app)
+    instrumentation.init_app(app)
+    serving.init_app(app)
+    app.cli.add_command(search_cli)
+    app.cli.add_command(catalog_cli)
+    app.cli.add_command(jobs_cli)
+    app.cli.add_command(plans_cli)
+    app.cli.add_command(products_cli)
+    app.cli.add_command(stats_cli)
 
     # Register Blueprints
     from app.routes.user import user_bp
@@ -0,0 +1,231 @@
+import json
+import re
+
+from app.cache import MISSING, LRUCache, SingleFlight
+from app.catalog import catalog_cache, get_service_snapshots, get_services_by_id
+from app.matching import AhoCorasick
+from app.retrieval import STOPWORDS
+from app.search import tokenize
+
+# Reasoning models prepend their chain of thought in <think> tags
+_THINK_RE = re.compile(r'<think>.*?</think>', re.DOTALL)
+
+
+# System prompt asking for a JSON answer that references services by id
+def build_prompt(user_input, candidates):
+    service_list_str = "\n".join(f"[{service.service_id}] {service.service_name}" for service in candidates)
+    return (
+        f"You are an AI research assistant specializing in scientific research and service recommendations. "
+        f"Here is a list of available services, each prefixed with its id:\n{service_list_str}\n"
+        f"User Query: {user_input}\n"
+        f"Your task:\n"
+        f"1. Provide research insights or solutions if the query requires analytical thinking or problem-solving.\n"
+        f"2. If the query is related to research services, recommend the most relevant services from the list.\n"
+        f"3. Only include services that match the context of the query and exist in the provided list.\n"
+        f"Reply with a single JSON object and nothing else, in the form "
+        f'{{"insights": "<your research insights>", "service_ids": [<ids of recommended services>]}}.'
+    )
+
+
+# Chat messages for one ai_search turn
+def build_messages(user_input, candidates):
+    return [
+        {"role": "system", "content": build_prompt(user_input, candidates)},
+        {"role": "user", "content": user_input}
+    ]
+
+
+# JSON shape of a recommended service in ai_search responses
+def service_to_dict(service):
+    return {
+        "id": service.service_id,
+        "name": service.service_name,
+        "description": service.service_description,
+        "accreditation": service.accreditation
+    }
+
+
+# Automaton over every lowercased service name, built once per catalog version
+def get_name_matcher():
+    def build():
+        by_name = {}
+        for snapshot in get_service_snapshots():
+            by_name.setdefault(snapshot.service_name.lower(), []).append(snapshot)
+        return AhoCorasick(by_name)
+    return catalog_cache.get('name_matcher', build, shared=False)
+
+
+# Split the model's answer into (research insights, recommended services)
+def parse_answer(ai_response):
+    text = _THINK_RE.sub('', ai_response).strip()
+
+    structured = _parse_structured(text)
+    if structured is not None:
+        return structured
+    return _parse_free_text(text)
+
+
+# Preferred path: a JSON object whose ids are checked against the catalog
+def _parse_structured(text):
+    start, end = text.find('{'), text.rfind('}')
+    if start == -1 or end <= start:
+        return None
+    try:
+        payload = json.loads(text[start:end + 1])
+    except ValueError:
+        return None
+    if not isinstance(payload, dict):
+        return None
+
+    services_by_id = get_services_by_id()
+    services = {}
+    for raw_id in payload.get('service_ids') or []:
+        try:
+            service_id = int(raw_id)
+        except (TypeError, ValueError):
+            continue
+        if service_id in services_by_id:
+            services[service_id] = services_by_id[service_id]
+
+    insights = payload.get('insights') or ''
+    if not isinstance(insights, str):
+        insights = json.dumps(insights)
+    return insights, list(services.values())
+
+
+# Fallback for free-text answers: one pass per line over all service names.
+# Lines that mention a service are recommendations, the rest are insights.
+def _parse_free_text(text):
+    matcher = get_name_matcher()
+    services = {}
+    research_insights = []
+
+    for line in text.splitlines():
+        line = line.strip("-•1234567890. ").lower()
+        matches = matcher.find_all(line)
+        if not matches:
+            research_insights.append(line)
+        for snapshots in matches:
+            for snapshot in snapshots:
+                services[snapshot.service_id] = snapshot
+
+    return "\n".join(research_insights), list(services.values())
+
+
+_SERVICE_IDS_RE = re.compile(r'"service_ids"\s*:\s*\[([^\]]*)(\]?)')
+_COMPLETE_ID_RE = re.compile(r'"?(\d+)"?\s*[,\]]')
+
+
+# Recognizes services in a streamed answer as soon as they are complete:
+# ids inside a JSON "service_ids" array, or service names in free text.
+# feed() returns only services not reported before.
+class StreamingMatcher:
+    def __init__(self):
+        self.matcher = get_name_matcher()
+        self.services_by_id = get_services_by_id()
+        self.text = ''
+        self._state = 0
+        self._matched_upto = 0
+        self._seen = set()
+
+    def feed(self, chunk):
+        self.text += chunk
+        answer_start = self._answer_start()
+        if answer_start is None:
+            return []
+
+        answer = self.text[answer_start:]
+        if answer.lstrip().startswith('{'):
+            found = self._complete_ids(answer)
+        else:
+            start = max(self._matched_upto, answer_start)
+            self._state, matches = self.matcher.feed(self.text[start:].lower(), self._state)
+            self._matched_upto = len(self.text)
+            found = [snapshot for snapshots in matches for snapshot in snapshots]
+
+        new = []
+        for snapshot in found:
+            if snapshot.service_id not in self._seen:
+                self._seen.add(snapshot.service_id)
+                new.append(snapshot)
+        return new
+
+    # Index where the answer proper begins, or None while the model is still
+    # inside (or may be opening) a <think> block
+    def _answer_start(self):
+        stripped = self.text.lstrip()
+        if not stripped:
+            return None
+        if stripped.startswith('<think>'):
+            end = self.text.find('</think>')
+            return None if end == -1 else end + len('</think>')
+        if '<think>'.startswith(stripped):
+            return None
+        return 0
+
+    def _complete_ids(self, answer):
+        match = _SERVICE_IDS_RE.search(answer)
+        if not match:
+            return []
+        ids = _COMPLETE_ID_RE.findall(match.group(1) + match.group(2))
+        return [self.services_by_id[int(service_id)] for service_id in ids if int(service_id) in self.services_by_id]
+
+
+# Fold case, whitespace and stopwords so trivially different phrasings of a
+# question share one cache entry
+def normalize_query(query):
+    tokens = tokenize(query)
+    return ' '.join([token for token in tokens if token not in STOPWORDS] or tokens)
+
+
+# Cache of complete ai_search answers keyed on the normalized query and the
+# catalog version, so any SupplierService change invalidates every answer.
+# Concurrent misses for the same key share a single upstream LLM call.
+class AnswerCache:
+    def __init__(self, maxsize=1024, ttl=3600):
+        self.cache = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.flight = SingleFlight()
+
+    def configure(self, maxsize, ttl):
+        self.cache = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    def key(self, query):
+        return catalog_cache.version, normalize_query(query)
+
+    def get(self, query):
+        value = self.cache.get(self.key(query))
+        return None if value is MISSING else value
+
+    def set(self, query, answer):
+        self.cache.set(self.key(query), answer)
+
+    def clear(self):
+        self.cache.clear()
+
+    # Return the cached answer or compute it once across concurrent callers.
+    # Exceptions are shared with the waiting callers but never cached.
+    def get_or_compute(self, query, compute):
+        key = self.key(query)
+        value = self.cache.get(key)
+        if value is not MISSING:
+            return value
+
+        def load():
+            answer = compute()
+            self.cache.set(key, answer)
+            return answer
+        return self.flight.do(key, load)
+
+    def stats(self):
+        stats = self.cache.stats()
+        stats["shared_calls"] = self.flight.shared
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+
+answer_cache = AnswerCache()
+
+
+def init_app(app):
+    answer_cache.configure(maxsize=app.config['AI_CACHE_SIZE'], ttl=app.config['AI_CACHE_TTL'])
@@ -0,0 +1,180 @@
+import threading
+from collections import namedtuple
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+from werkzeug.utils import import_string
+
+from app.cache import MISSING, LocalSharedCache, LRUCache, RedisSharedCache
+from app.db_routing import primary
+from app.extensions import db
+from app.models import SupplierService
+
+# Detached, immutable copy of a service row that is safe to share across requests
+ServiceSnapshot = namedtuple(
+    'ServiceSnapshot', ['service_id', 'service_name', 'service_description', 'accreditation']
+)
+
+VERSION_KEY = 'catalog:version'
+
+
+# Read-through cache for SupplierService reads keyed on a catalog version.
+# Every committed change to supplier_services bumps the version, so entries
+# cached under an older version are never served again.
+class CatalogCache:
+    def __init__(self, maxsize=256, ttl=300, shared=None):
+        self.local = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.shared = shared
+        self.ttl = ttl
+        self._version = 0
+        self._lock = threading.Lock()
+        self.shared_hits = 0
+        self.shared_misses = 0
+
+    def configure(self, maxsize, ttl, shared=None):
+        self.local = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.ttl = ttl
+        self.shared = shared
+
+    # The shared tier, when present, holds the authoritative version so that
+    # every process sees a bump made by any of them
+    @property
+    def version(self):
+        if self.shared is not None:
+            return int(self.shared.get(VERSION_KEY) or 0)
+        return self._version
+
+    def bump(self):
+        with self._lock:
+            if self.shared is not None:
+                version = self.shared.incr(VERSION_KEY)
+            else:
+                self._version += 1
+                version = self._version
+        # Entries for older versions can never be hit again
+        self.local.clear()
+        return version
+
+    # Return the cached value for key at the current version, calling loader()
+    # and caching its result on a miss. Structures that are cheap to rebuild
+    # from other cached entries can opt out of the shared tier.
+    def get(self, key, loader, shared=True):
+        versioned_key = (self.version, key)
+        shared = shared and self.shared is not None
+
+        value = self.local.get(versioned_key)
+        if value is not MISSING:
+            return value
+
+        if shared:
+            value = self.shared.get(repr(versioned_key))
+            if value is not None:
+                self.shared_hits += 1
+                self.local.set(versioned_key, value)
+                return value
+            self.shared_misses += 1
+
+        # A lagging replica could hand back data older than this version
+        with primary():
+            value = loader()
+        self.local.set(versioned_key, value)
+        if shared:
+            self.shared.set(repr(versioned_key), value, ttl=self.ttl)
+        return value
+
+    def stats(self):
+        stats = {"version": self.version, "local": self.local.stats()}
+        if self.shared is not None:
+            stats["shared"] = {"hits": self.shared_hits, "misses": self.shared_misses}
+        return stats
+
+
+catalog_cache = CatalogCache()
+
+
+# Every service in the catalog as detached snapshots
+def load_service_snapshots():
+    rows = db.session.execute(
+        select(
+            SupplierService.service_id,
+            SupplierService.service_name,
+            SupplierService.service_description,
+            SupplierService.accreditation
+        ).order_by(SupplierService.service_id)
+    )
+    return [ServiceSnapshot(*row) for row in rows]
+
+
+# Cached full catalog used by the AI assistant
+def get_service_snapshots():
+    return catalog_cache.get('services', load_service_snapshots)
+
+
+# Cached service_id -> snapshot map for validating ids returned by the AI assistant
+def get_services_by_id():
+    return catalog_cache.get(
+        'services_by_id',
+        lambda: {snapshot.service_id: snapshot for snapshot in get_service_snapshots()},
+        shared=False
+    )
+
+
+# Row count, highest id and latest updated_at: together they change whenever
+# a service is added, edited or deleted, so page ETags can be derived from them
+def load_catalog_stamp():
+    return tuple(db.session.execute(
+        select(func.count(), func.max(SupplierService.service_id), func.max(SupplierService.updated_at))
+    ).one())
+
+
+def get_catalog_stamp():
+    return catalog_cache.get('catalog_stamp', load_catalog_stamp)
+
+
+# Flag the session so the catalog version is bumped once it commits. Needed for
+# bulk statements that bypass the unit of work; ORM changes are picked up
+# automatically.
+def mark_catalog_changed(session=None):
+    session = session or db.session
+    session.info['catalog_changed'] = True
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_catalog_changes(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, SupplierService):
+            session.info['catalog_changed'] = True
+            return
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_catalog_version(session):
+    if session.info.pop('catalog_changed', False):
+        catalog_cache.bump()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_catalog_changes(session):
+    session.info.pop('catalog_changed', None)
+
+
+# Whether a catalog change made in this process invalidates every other
+# process's cached reads. Without that, running more than one process serves
+# stale catalog data.
+def shared_across_processes():
+    return catalog_cache.shared is not None and not isinstance(catalog_cache.shared, LocalSharedCache)
+
+
+# Size the cache from config and attach the optional shared tier: a
+# redis:// URL or the import path of a factory
+def init_app(app):
+    shared = app.config.get('CATALOG_SHARED_CACHE')
+    if isinstance(shared, str) and shared.startswith(('redis://', 'rediss://', 'unix://')):
+        shared = RedisSharedCache(shared)
+    elif isinstance(shared, str):
+        shared = import_string(shared)()
+    catalog_cache.configure(
+        maxsize=app.config['CATALOG_CACHE_SIZE'],
+        ttl=app.config['CATALOG_CACHE_TTL'],
+        shared=shared,
+    )
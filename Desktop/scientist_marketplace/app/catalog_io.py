@@ -0,0 +1,229 @@
+import csv
+import gzip
+import io
+import json
+import time
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import insert, select
+
+from app.catalog import mark_catalog_changed
+from app.extensions import db
+from app.models import Product, Supplier, SupplierService
+from app.products import record_inserted_products
+
+FORMATS = ('csv', 'jsonl')
+
+# Errors kept in an import report; rows past this are only counted
+MAX_REPORTED_ERRORS = 100
+
+
+class RowError(ValueError):
+    pass
+
+
+def _text(value, max_length=None):
+    value = '' if value is None else str(value).strip()
+    if max_length and len(value) > max_length:
+        raise ValueError(f'longer than {max_length} characters')
+    return value
+
+
+def _integer(value):
+    if value is None or value == '':
+        return None
+    return int(value)
+
+
+def _number(value):
+    if value is None or value == '':
+        return None
+    return float(value)
+
+
+# Importable columns per kind: (column, converter, required)
+IMPORT_KINDS = {
+    'services': (SupplierService, (
+        ('service_name', lambda value: _text(value, 255), True),
+        ('service_description', _text, True),
+        ('accreditation', lambda value: _text(value, 255) or None, False),
+        ('supplier_id', _integer, True),
+    )),
+    'products': (Product, (
+        ('name', lambda value: _text(value, 255), True),
+        ('price', _number, True),
+        ('description', lambda value: _text(value) or None, False),
+        ('stock', _integer, False),
+        ('accreditation', lambda value: _text(value, 255) or None, False),
+        ('supplier_id', _integer, True),
+    )),
+}
+
+
+# Format from a file name such as services.csv or products.jsonl.gz
+def detect_format(filename):
+    name = (filename or '').lower()
+    if name.endswith('.gz'):
+        name = name[:-3]
+    for fmt in FORMATS:
+        if name.endswith(f'.{fmt}'):
+            return fmt
+    return None
+
+
+# Lazily yield (line number, raw row dict) from a binary stream.
+# Gzip input is recognised by its magic bytes and decompressed on the fly.
+def read_rows(stream, fmt):
+    if not hasattr(stream, 'peek') and stream.seekable():
+        magic = stream.read(2)
+        stream.seek(0)
+    else:
+        stream = stream if hasattr(stream, 'peek') else io.BufferedReader(stream)
+        magic = stream.peek(2)[:2]
+    if magic == b'\x1f\x8b':
+        stream = gzip.GzipFile(fileobj=stream)
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == 'jsonl':
+        for line_number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_number, RowError(f'invalid JSON: {e}')
+                continue
+            yield line_number, row if isinstance(row, dict) else RowError('expected a JSON object')
+    else:
+        raise ValueError(f'Unsupported format {fmt!r}; expected one of {", ".join(FORMATS)}')
+
+
+# Convert one raw row to column values, raising RowError when it is invalid
+def validate_row(columns, row, supplier_ids, default_supplier_id=None):
+    if isinstance(row, RowError):
+        raise row
+    values = {}
+    for column, convert, required in columns:
+        raw = row.get(column)
+        if column == 'supplier_id' and raw in (None, ''):
+            raw = default_supplier_id
+        try:
+            value = convert(raw)
+        except (TypeError, ValueError) as e:
+            raise RowError(f'{column}: {e}')
+        if required and value in (None, ''):
+            raise RowError(f'{column} is required')
+        values[column] = value
+    if values['supplier_id'] not in supplier_ids:
+        raise RowError(f'supplier_id {values["supplier_id"]} does not exist')
+    return values
+
+
+# Write a batch with one COPY ... FROM STDIN (Postgres) or one executemany INSERT
+def write_batch(table, column_names, batch):
+    connection = db.session.connection()
+    if connection.dialect.name == 'postgresql' and connection.dialect.driver == 'psycopg2':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for values in batch:
+            writer.writerow(['\\N' if values[name] is None else values[name] for name in column_names])
+        buffer.seek(0)
+        cursor = connection.connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {table.name} ({', '.join(column_names)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+                buffer,
+            )
+        finally:
+            cursor.close()
+    else:
+        connection.execute(insert(table), batch)
+
+
+# Core inserts bypass the ORM hooks, so imported products are added to the
+# facet index here
+def _write_rows(model, column_names, batch):
+    write_batch(model.__table__, column_names, batch)
+    if model is Product:
+        record_inserted_products(batch)
+
+
+# Stream rows from a CSV/JSONL (optionally gzipped) file into the catalog in
+# batches. Invalid rows are skipped and reported; valid rows are written in a
+# single transaction. Memory use is bounded by batch_size, not the file size.
+def import_catalog(stream, kind, fmt, default_supplier_id=None, batch_size=None, dry_run=False):
+    if kind not in IMPORT_KINDS:
+        raise ValueError(f'Unknown kind {kind!r}; expected one of {", ".join(IMPORT_KINDS)}')
+    model, columns = IMPORT_KINDS[kind]
+    column_names = [column for column, _, _ in columns]
+    batch_size = batch_size or current_app.config['IMPORT_BATCH_SIZE']
+    supplier_ids = set(db.session.scalars(select(Supplier.supplier_id)))
+
+    started = time.perf_counter()
+    report = {"kind": kind, "rows": 0, "imported": 0, "skipped": 0, "errors": []}
+    batch = []
+    try:
+        for line_number, row in read_rows(stream, fmt):
+            report["rows"] += 1
+            try:
+                batch.append(validate_row(columns, row, supplier_ids, default_supplier_id))
+            except RowError as e:
+                report["skipped"] += 1
+                if len(report["errors"]) < MAX_REPORTED_ERRORS:
+                    report["errors"].append({"line": line_number, "error": str(e)})
+                continue
+            if len(batch) >= batch_size:
+                if not dry_run:
+                    _write_rows(model, column_names, batch)
+                report["imported"] += len(batch)
+                batch = []
+        if batch:
+            if not dry_run:
+                _write_rows(model, column_names, batch)
+            report["imported"] += len(batch)
+
+        if dry_run:
+            db.session.rollback()
+        else:
+            if model is SupplierService:
+                mark_catalog_changed()
+            db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    elapsed = time.perf_counter() - started
+    report["elapsed_s"] = round(elapsed, 3)
+    report["rows_per_sec"] = round(report["imported"] / elapsed, 1) if elapsed else 0.0
+    return report
+
+
+catalog_cli = AppGroup('catalog', help='Bulk import of services and products from CSV or JSON Lines files.')
+
+
+@catalog_cli.command('import')
+@click.argument('kind', type=click.Choice(list(IMPORT_KINDS)))
+@click.argument('source', type=click.File('rb'))
+@click.option('--format', 'fmt', type=click.Choice(FORMATS), help='Input format; detected from the file name by default.')
+@click.option('--supplier-id', type=int, help='Supplier for rows without a supplier_id column.')
+@click.option('--batch-size', type=int, help='Rows per INSERT/COPY batch.')
+@click.option('--dry-run', is_flag=True, help='Validate the file without writing anything.')
+def import_command(kind, source, fmt, supplier_id, batch_size, dry_run):
+    fmt = fmt or detect_format(source.name)
+    if fmt is None:
+        raise click.UsageError('Cannot detect the format from the file name; pass --format.')
+
+    report = import_catalog(source, kind, fmt, default_supplier_id=supplier_id, batch_size=batch_size, dry_run=dry_run)
+    for error in report["errors"]:
+        click.echo(f'line {error["line"]}: {error["error"]}', err=True)
+    verb = 'Validated' if dry_run else 'Imported'
+    click.echo(
+        f'{verb} {report["imported"]} of {report["rows"]} {kind} rows '
+        f'({report["skipped"]} skipped) in {report["elapsed_s"]}s, {report["rows_per_sec"]} rows/sec.'
+    )
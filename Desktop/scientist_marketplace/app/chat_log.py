@@ -0,0 +1,122 @@
+import atexit
+import os
+import threading
+import uuid
+from datetime import datetime, timezone
+
+from flask import session
+from sqlalchemy import insert
+
+from app.extensions import db
+from app.models import ChatLog
+
+# Flask session key holding an anonymous visitor's chat history id
+CLIENT_ID_KEY = 'chat_client_id'
+
+
+# History id of the current visitor, created on their first question
+def history_id(create=True):
+    if CLIENT_ID_KEY not in session and create:
+        session[CLIENT_ID_KEY] = uuid.uuid4().hex
+    return session.get(CLIENT_ID_KEY)
+
+
+# Buffers chat turns in memory and inserts them in batches from a background
+# thread, once batch_size rows are waiting or every interval seconds, so
+# requests never wait on the write. The buffer is bounded: when the database
+# can't keep up, new rows are dropped and counted rather than queued forever.
+class ChatLogWriter:
+    def __init__(self, batch_size=100, interval=1.0, max_pending=10000):
+        self.app = None
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_pending = max_pending
+        self._pending = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pid = None
+        self.counters = {"written": 0, "dropped": 0, "failed": 0}
+
+    def configure(self, app, batch_size, interval, max_pending):
+        self.app = app
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_pending = max_pending
+
+    # Threads don't survive fork(), so start the flusher lazily in each process
+    def _ensure_thread(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            threading.Thread(target=self._run, name='chat-log-writer', daemon=True).start()
+            self._pid = os.getpid()
+
+    def record(self, role, message, client_id=None, user_id=None, latency_ms=None, prompt_tokens=None, completion_tokens=None):
+        row = {
+            "user_id": user_id,
+            "client_id": client_id,
+            "role": role,
+            "message": message,
+            "latency_ms": latency_ms,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "created_at": datetime.now(timezone.utc).replace(tzinfo=None),
+        }
+        self._ensure_thread()
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                self.counters["dropped"] += 1
+                return
+            self._pending.append(row)
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+    # Write everything buffered so far. Rows of a failed batch are dropped
+    # and counted; chat history is not worth blocking the buffer for.
+    def flush(self):
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = self._pending[:self.batch_size]
+                    del self._pending[:self.batch_size]
+                if not batch:
+                    return
+                try:
+                    with self.app.app_context():
+                        db.session.execute(insert(ChatLog.__table__), batch)
+                        db.session.commit()
+                except Exception:
+                    self.counters["failed"] += len(batch)
+                    self.app.logger.exception('Dropped %d chat log rows', len(batch))
+                else:
+                    self.counters["written"] += len(batch)
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._pending)
+        return dict(self.counters, pending=pending)
+
+
+chat_log = ChatLogWriter()
+
+# Don't lose the last interval's turns on a clean shutdown
+atexit.register(chat_log.flush)
+
+
+def init_app(app):
+    chat_log.configure(
+        app,
+        batch_size=app.config['CHAT_LOG_BATCH_SIZE'],
+        interval=app.config['CHAT_LOG_FLUSH_INTERVAL'],
+        max_pending=app.config['CHAT_LOG_MAX_PENDING'],
+    )
@@ -0,0 +1,43 @@
+from sqlalchemy import and_, bindparam, insert, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+# Dialects with INSERT ... ON CONFLICT DO UPDATE
+UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+# Add each row's deltas to the counter columns stored under its key columns,
+# creating missing rows, in the session's current transaction. Updates are
+# relative, so concurrent writers don't overwrite each other. A missing row
+# starts from the positive deltas only: a decrement that arrives before the
+# row exists (e.g. after a reconcile dropped it) must not create a negative
+# count.
+def increment(session, table, key_columns, rows):
+    if not rows:
+        return
+    counter_columns = [name for name in rows[0] if name not in key_columns]
+    initial = [
+        {**row, **{name: max(row[name], 0) for name in counter_columns}}
+        for row in rows
+    ]
+
+    make_insert = UPSERT_INSERTS.get(session.get_bind().dialect.name)
+    if make_insert is not None:
+        # The inserted values are clamped, so the update adds the raw delta
+        # from its own parameter rather than excluded.<column>
+        stmt = make_insert(table).on_conflict_do_update(
+            index_elements=list(key_columns),
+            set_={name: table.c[name] + bindparam(f'delta_{name}') for name in counter_columns},
+        )
+        session.execute(stmt, [
+            {**first, **{f'delta_{name}': row[name] for name in counter_columns}}
+            for first, row in zip(initial, rows)
+        ])
+        return
+
+    for first, row in zip(initial, rows):
+        key = and_(*(table.c[name] == row[name] for name in key_columns))
+        result = session.execute(
+            update(table).where(key).values({name: table.c[name] + row[name] for name in counter_columns})
+        )
+        if not result.rowcount:
+            session.execute(insert(table).values(first))
@@ -0,0 +1,117 @@
+import random
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import current_app, g, has_request_context, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.sql.dml import UpdateBase
+
+REPLICA_BIND_PREFIX = 'replica_'
+
+# Flask session key holding the time of the client's last committed write
+LAST_WRITE_KEY = 'db_last_write'
+
+
+# Engine options for one database URL from the DB_* settings. Pool sizing
+# only applies to QueuePool engines, so SQLite keeps its default pool.
+def engine_options(url, config):
+    options = {
+        "pool_pre_ping": config['DB_POOL_PRE_PING'],
+        "pool_recycle": config['DB_POOL_RECYCLE'],
+    }
+    backend = make_url(url).get_backend_name()
+    if backend != 'sqlite':
+        options.update(
+            pool_size=config['DB_POOL_SIZE'],
+            max_overflow=config['DB_MAX_OVERFLOW'],
+            pool_timeout=config['DB_POOL_TIMEOUT'],
+        )
+    if backend == 'postgresql' and config['DB_STATEMENT_TIMEOUT_MS']:
+        options["connect_args"] = {"options": f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT_MS']}"}
+    return options
+
+
+# Engine options for the primary and one bind per replica URL. Must run
+# before db.init_app(); explicit SQLALCHEMY_* settings are left alone.
+def configure(app):
+    config = app.config
+    config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(config['SQLALCHEMY_DATABASE_URI'], config))
+    binds = config.setdefault('SQLALCHEMY_BINDS', {})
+    for index, url in enumerate(config['DATABASE_REPLICA_URLS']):
+        binds.setdefault(f'{REPLICA_BIND_PREFIX}{index}', {"url": url, **engine_options(url, config)})
+
+
+# Session that sends reads to the replica chosen for the request, if any.
+# Flushes and INSERT/UPDATE/DELETE statements always go to the primary.
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        replica = self.info.get('replica')
+        if replica is not None and bind is None and not self._flushing and not isinstance(clause, UpdateBase):
+            return self._db.engines[replica]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def replica_binds():
+    return [key for key in current_app.config.get('SQLALCHEMY_BINDS', {}) if key.startswith(REPLICA_BIND_PREFIX)]
+
+
+# Whether the client committed a write recently enough that a replica might
+# not have it yet
+def _recently_wrote():
+    last_write = session.get(LAST_WRITE_KEY)
+    return last_write is not None and time.time() - last_write < current_app.config['READ_YOUR_WRITES_SECONDS']
+
+
+# Route this request's reads to a replica, unless none is configured or the
+# client has to read its own recent writes
+def use_replica():
+    db = current_app.extensions['sqlalchemy']
+    binds = replica_binds()
+    if not binds or _recently_wrote():
+        return None
+    replica = db.session.info['replica'] = random.choice(binds)
+    return replica
+
+
+# For read-only views that tolerate replication lag
+def read_replica(view):
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        use_replica()
+        return view(*args, **kwargs)
+    return wrapped
+
+
+# Read from the primary inside the block, e.g. to fill a shared cache
+@contextmanager
+def primary():
+    db = current_app.extensions['sqlalchemy']
+    replica = db.session.info.pop('replica', None)
+    try:
+        yield
+    finally:
+        if replica is not None:
+            db.session.info['replica'] = replica
+
+
+# Any INSERT/UPDATE/DELETE in a request makes its commit a write the client
+# must be able to read back
+@event.listens_for(Engine, 'after_cursor_execute')
+def _note_write(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and (context.isinsert or context.isupdate or context.isdelete) and has_request_context():
+        g.db_wrote = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _stick_to_primary(db_session):
+    if has_request_context() and g.pop('db_wrote', False):
+        session[LAST_WRITE_KEY] = time.time()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_write(db_session):
+    if has_request_context():
+        g.pop('db_wrote', None)
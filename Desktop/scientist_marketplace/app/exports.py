@@ -0,0 +1,108 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import select
+
+from app.extensions import db
+from app.models import ServiceRequest, ServiceResponse, SupplierService
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+# One row per response, or one per request that has none yet
+REQUEST_EXPORT_COLUMNS = (
+    ('request_id', ServiceRequest.request_id),
+    ('service_id', ServiceRequest.service_id),
+    ('service_name', SupplierService.service_name),
+    ('user_name', ServiceRequest.user_name),
+    ('email', ServiceRequest.email),
+    ('phone_number', ServiceRequest.phone_number),
+    ('research_description', ServiceRequest.research_description),
+    ('requested_at', ServiceRequest.created_at),
+    ('response_id', ServiceResponse.response_id),
+    ('supplier_id', ServiceResponse.supplier_id),
+    ('response_details', ServiceResponse.response_details),
+    ('price', ServiceResponse.price),
+    ('responded_at', ServiceResponse.created_at),
+)
+
+
+# Parse a since/until bound; a bare date for `until` covers that whole day
+def parse_bound(value, end=False):
+    if not value:
+        return None
+    if len(value) == 10:
+        day = date.fromisoformat(value)
+        return datetime.combine(day + timedelta(days=1) if end else day, datetime.min.time())
+    return datetime.fromisoformat(value)
+
+
+def request_export_query(service_id=None, since=None, until=None):
+    stmt = (
+        select(*(column.label(name) for name, column in REQUEST_EXPORT_COLUMNS))
+        .join(SupplierService, SupplierService.service_id == ServiceRequest.service_id)
+        .outerjoin(ServiceResponse, ServiceResponse.request_id == ServiceRequest.request_id)
+        .order_by(ServiceRequest.request_id, ServiceResponse.response_id)
+    )
+    if service_id is not None:
+        stmt = stmt.where(ServiceRequest.service_id == service_id)
+    if since is not None:
+        stmt = stmt.where(ServiceRequest.created_at >= since)
+    if until is not None:
+        stmt = stmt.where(ServiceRequest.created_at < until)
+    return stmt
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+# Serialize result partitions into encoded chunks, one chunk per partition
+def _encode_rows(partitions, names, fmt):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == 'csv' else None
+    if writer:
+        writer.writerow(names)
+
+    for rows in partitions:
+        for row in rows:
+            if writer:
+                writer.writerow(['' if value is None else value for value in row])
+            else:
+                buffer.write(json.dumps(dict(zip(names, row)), default=_json_default))
+                buffer.write('\n')
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+
+    # Header-only CSV for an empty export
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+# Compress a chunk stream incrementally into a single gzip member
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+# Stream the export as encoded chunks. Rows are fetched yield_per at a time
+# (a server-side cursor on Postgres), so memory doesn't grow with the export.
+def stream_request_export(stmt, fmt, compress=False, yield_per=1000):
+    result = db.session.execute(stmt.execution_options(yield_per=yield_per))
+    chunks = _encode_rows(result.partitions(), list(result.keys()), fmt)
+    try:
+        yield from gzip_chunks(chunks) if compress else chunks
+    finally:
+        result.close()
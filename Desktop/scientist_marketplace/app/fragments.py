@@ -0,0 +1,72 @@
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+from app.cache import MISSING, LRUCache
+
+
+# Rendered template fragments keyed on (fragment name, object id). Each entry
+# remembers the version it was rendered for, so an edited object misses
+# without an explicit invalidation, and every object holds at most one entry
+# per fragment.
+class FragmentCache:
+    def __init__(self, maxsize=10000):
+        self.entries = LRUCache(maxsize=maxsize)
+        self.names = set()
+
+    def configure(self, maxsize):
+        self.entries = LRUCache(maxsize=maxsize)
+
+    def get(self, name, object_id, version):
+        entry = self.entries.get((name, object_id))
+        if entry is MISSING or entry[0] != version:
+            return MISSING
+        return entry[1]
+
+    def set(self, name, object_id, version, markup):
+        self.names.add(name)
+        self.entries.set((name, object_id), (version, markup))
+
+    # Drop every fragment rendered for these objects, e.g. once they are deleted
+    def invalidate(self, *object_ids):
+        for name in list(self.names):
+            for object_id in object_ids:
+                self.entries.delete((name, object_id))
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        return self.entries.stats()
+
+
+fragment_cache = FragmentCache()
+
+
+# {% cache 'service_row', service.service_id, service.updated_at %}...{% endcache %}
+# renders the body once per object version and replays the cached markup after
+# that. The body must depend only on the object, not on the request or user.
+class FragmentCacheExtension(Extension):
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+        if len(args) != 3:
+            parser.fail('cache takes a fragment name, an object id and a version', lineno)
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        return nodes.CallBlock(self.call_method('_cached', args), [], [], body).set_lineno(lineno)
+
+    def _cached(self, name, object_id, version, caller):
+        markup = fragment_cache.get(name, object_id, version)
+        if markup is MISSING:
+            markup = Markup(caller())
+            fragment_cache.set(name, object_id, version, markup)
+        return markup
+
+
+def init_app(app):
+    fragment_cache.configure(maxsize=app.config['FRAGMENT_CACHE_SIZE'])
+    app.jinja_env.add_extension(FragmentCacheExtension)
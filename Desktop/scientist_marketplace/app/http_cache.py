@@ -0,0 +1,47 @@
+import hashlib
+
+from flask import Response, current_app, make_response, request, session
+from werkzeug.http import is_resource_modified
+
+
+# Opaque validator for a page that depends only on parts. The release is
+# mixed in so a deploy that changes templates invalidates cached copies.
+def make_etag(*parts):
+    raw = '\x1f'.join(str(part) for part in (current_app.config['ETAG_RELEASE'], *parts))
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+# Anonymous pages can be stored by a reverse proxy; anything served to a
+# client with session state (flashes, read-your-writes) stays private
+def _cache_control(response):
+    if session:
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+    else:
+        response.cache_control.public = True
+        response.cache_control.max_age = 0
+        response.cache_control.s_maxage = current_app.config['HTTP_CACHE_SHARED_MAX_AGE']
+    response.vary.add('Cookie')
+    return response
+
+
+def _validate(response, etag, last_modified):
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    return _cache_control(response)
+
+
+# 304 response when the client's If-None-Match / If-Modified-Since still
+# matches, else None. If-None-Match wins when both are sent.
+def not_modified(etag, last_modified=None):
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    if is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        return None
+    return _validate(Response(status=304), etag, last_modified)
+
+
+# The rendered page with its validators and Cache-Control
+def cacheable(body, etag, last_modified=None):
+    return _validate(make_response(body), etag, last_modified)
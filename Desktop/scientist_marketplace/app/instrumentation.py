@@ -0,0 +1,242 @@
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import Response, before_render_template, current_app, g, has_app_context, request, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.orm import Session
+
+from app import metrics
+from app.assistant import answer_cache
+from app.catalog import catalog_cache
+from app.chat_log import chat_log
+from app.fragments import fragment_cache
+from app.jobs import queue_stats
+
+# Statements and timings tracked for the current request (or track_queries block)
+_current = ContextVar('request_stats', default=None)
+
+
+class NPlusOneDetected(Exception):
+    pass
+
+
+# Statement count, database time, per-statement repeats and named timings
+# (template rendering, LLM calls) of one request. Statements also count
+# towards an enclosing tracker, so track_queries() sees a whole request.
+class RequestStats:
+    def __init__(self, parent=None):
+        self.parent = parent
+        self.started = time.perf_counter()
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+        self.timings = {}
+        self.render_started = None
+
+    def record_statement(self, statement, seconds):
+        stats = self
+        while stats is not None:
+            stats.count += 1
+            stats.duration += seconds
+            stats.statements[statement] += 1
+            stats = stats.parent
+
+    def add_timing(self, name, seconds):
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    # Statements issued at least threshold times, most repeated first. The
+    # same SQL text with different parameters is the signature of an N+1.
+    def repeated(self, threshold=3):
+        return [(statement, count) for statement, count in self.statements.most_common() if count >= threshold]
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _start_statement(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _end_statement(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None or not conn.info.get('query_started'):
+        return
+    stats.record_statement(statement, time.perf_counter() - conn.info['query_started'].pop())
+
+
+# With RAISE_ON_LAZY_LOAD, a lazy='select' relationship that needs SQL to
+# load fails like lazy='raise_on_sql' would. Read from the current app's
+# config on every load, so tests and per-app settings can switch it; left
+# unset, it is on in debug mode (FLASK_DEBUG or app.run(debug=True)).
+@event.listens_for(Session, 'do_orm_execute')
+def _refuse_lazy_load(orm_execute_state):
+    if not orm_execute_state.is_select or orm_execute_state.lazy_loaded_from is None or not has_app_context():
+        return
+    raise_on_lazy_load = current_app.config['RAISE_ON_LAZY_LOAD']
+    if not (current_app.debug if raise_on_lazy_load is None else raise_on_lazy_load):
+        return
+    relationship = orm_execute_state.loader_strategy_path[-1]
+    if relationship.lazy == 'select':
+        raise InvalidRequestError(f"'{relationship}' is not available due to RAISE_ON_LAZY_LOAD")
+
+
+# Count the statements run inside the block:
+#     with track_queries() as stats:
+#         client.get('/user/services')
+#     assert not stats.repeated()
+@contextmanager
+def track_queries():
+    stats = RequestStats(parent=_current.get())
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+# Add the time spent in the block to the current request's Server-Timing
+@contextmanager
+def timed(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats = _current.get()
+        if stats is not None:
+            stats.add_timing(name, time.perf_counter() - started)
+
+
+def _begin_request():
+    g.request_stats = RequestStats(parent=_current.get())
+    g.request_stats_token = _current.set(g.request_stats)
+
+
+def _start_render(sender, template, context, **extra):
+    stats = _current.get()
+    if stats is not None:
+        stats.render_started = time.perf_counter()
+
+
+def _end_render(sender, template, context, **extra):
+    stats = _current.get()
+    started = stats.render_started if stats is not None else None
+    if started is not None:
+        stats.add_timing('render', time.perf_counter() - started)
+        stats.render_started = None
+
+
+def _server_timing(stats, total):
+    entries = [f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries"']
+    entries.extend(f'{name};dur={seconds * 1000:.1f}' for name, seconds in stats.timings.items())
+    entries.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(entries)
+
+
+# Server-Timing header and metrics for the response. Streamed bodies are
+# generated after this runs, so their statements and time aren't included.
+def _finish_request(response):
+    stats = g.pop('request_stats', None)
+    if stats is None:
+        return response
+
+    total = time.perf_counter() - stats.started
+    endpoint = request.endpoint or 'unmatched'
+    response.headers['Server-Timing'] = _server_timing(stats, total)
+    response.headers['X-Query-Count'] = str(stats.count)
+
+    metrics.REQUEST_SECONDS.observe(total, endpoint=endpoint, method=request.method)
+    metrics.REQUESTS.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    metrics.DB_STATEMENTS.inc(stats.count, endpoint=endpoint)
+    metrics.DB_SECONDS.inc(stats.duration, endpoint=endpoint)
+    if 'render' in stats.timings:
+        metrics.RENDER_SECONDS.inc(stats.timings['render'], endpoint=endpoint)
+
+    mode = current_app.config['QUERY_INSTRUMENTATION']
+    repeated = stats.repeated(current_app.config['QUERY_REPEAT_THRESHOLD']) if mode != 'off' else []
+    if repeated:
+        statement, count = repeated[0]
+        message = f'{request.method} {request.path} ran the same statement {count} times ({stats.count} total): {" ".join(statement.split())}'
+        if mode == 'raise':
+            raise NPlusOneDetected(message)
+        current_app.logger.warning('Possible N+1 query: %s', message)
+    return response
+
+
+def _end_request(exc):
+    token = g.pop('request_stats_token', None)
+    if token is not None:
+        _current.reset(token)
+
+
+# Prometheus text exposition of this process's metrics
+def metrics_view():
+    collect = current_app.extensions['metrics_collector']
+    return Response(metrics.registry.render(collect()), mimetype='text/plain; version=0.0.4')
+
+
+# Cache and LLM executor state, read at scrape time
+def _collect_app_stats(app):
+    def collect():
+        caches = metrics.Counter('cache_lookups_total', 'Cache lookups, by cache and result.', ('cache', 'result'))
+        evictions = metrics.Counter('cache_evictions_total', 'Entries evicted for size, by cache.', ('cache',))
+        entries = metrics.Gauge('cache_entries', 'Entries held, by cache.', ('cache',))
+        for name, stats in (
+            ('catalog', catalog_cache.stats()["local"]),
+            ('ai_answer', answer_cache.stats()),
+            ('fragment', fragment_cache.stats()),
+        ):
+            caches.set(stats["hits"], cache=name, result='hit')
+            caches.set(stats["misses"], cache=name, result='miss')
+            evictions.set(stats["evictions"], cache=name)
+            entries.set(stats["size"], cache=name)
+        version = metrics.Gauge('catalog_cache_version', 'Current catalog cache version.')
+        version.set(catalog_cache.version)
+
+        executor = app.extensions['llm_executor'].stats()
+        calls = metrics.Counter('llm_calls_total', 'LLM calls, by admission outcome.', ('outcome',))
+        for outcome in ('admitted', 'rate_limited', 'overloaded', 'circuit_open', 'timeouts', 'failures'):
+            calls.set(executor[outcome], outcome=outcome)
+        queued = metrics.Gauge('llm_queue_depth', 'LLM calls waiting for a worker.')
+        queued.set(executor["queued"])
+        breaker = metrics.Gauge('llm_circuit_open', '1 while the LLM circuit breaker rejects calls.')
+        breaker.set(int(executor["breaker"] != 'closed'))
+
+        writer = chat_log.stats()
+        chat_rows = metrics.Counter('chat_log_rows_total', 'Chat turns handed to the batched writer, by result.', ('result',))
+        for result in ('written', 'dropped', 'failed'):
+            chat_rows.set(writer[result], result=result)
+        chat_pending = metrics.Gauge('chat_log_pending', 'Chat turns buffered and not yet written.')
+        chat_pending.set(writer["pending"])
+
+        queue = queue_stats()
+        job_depth = metrics.Gauge('jobs', 'Background jobs in the queue table, by status.', ('status',))
+        for status in ('queued', 'running', 'done', 'failed'):
+            job_depth.set(queue[status], status=status)
+        job_lag = metrics.Gauge('job_queue_lag_seconds', 'Age of the oldest due job no worker has claimed.')
+        job_lag.set(queue["lag_seconds"])
+        job_throughput = metrics.Gauge('jobs_finished_last_minute', 'Background jobs completed in the last 60 seconds.')
+        job_throughput.set(queue["finished_recently"])
+        return [
+            caches, evictions, entries, version, calls, queued, breaker, chat_rows, chat_pending,
+            job_depth, job_lag, job_throughput,
+        ]
+    return collect
+
+
+# Per-request Server-Timing and metrics are always on; QUERY_INSTRUMENTATION=log
+# warns about, and =raise fails, any request that repeats one statement
+# QUERY_REPEAT_THRESHOLD times or more
+def init_app(app):
+    app.before_request(_begin_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_end_request)
+    before_render_template.connect(_start_render, app)
+    template_rendered.connect(_end_render, app)
+
+    if app.config['METRICS_ENABLED']:
+        app.extensions['metrics_collector'] = _collect_app_stats(app)
+        app.add_url_rule('/metrics', 'metrics', metrics_view)
@@ -0,0 +1,263 @@
+import json
+import os
+import random
+import signal
+import socket
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import delete, func, select, update
+
+from app.extensions import db
+from app.models import Job
+
+# Task functions by name, filled in by @task
+TASKS = {}
+
+jobs = Job.__table__
+
+
+def task(name):
+    def register(function):
+        TASKS[name] = function
+        return function
+    return register
+
+
+# Job timestamps are naive UTC, like CURRENT_TIMESTAMP on SQLite
+def utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+# Queue a job in the session's current transaction: workers see it once the
+# caller commits, and a rollback takes it away with the change it was for
+def enqueue(name, delay=0, **kwargs):
+    if name not in TASKS:
+        raise ValueError(f'Unknown job {name!r}')
+    now = utcnow()
+    job = Job(
+        name=name,
+        payload=json.dumps(kwargs),
+        run_at=now + timedelta(seconds=delay),
+        created_at=now,
+        max_attempts=current_app.config['JOB_MAX_ATTEMPTS'],
+    )
+    db.session.add(job)
+    return job
+
+
+# Mark up to limit due jobs as running and return them, in one statement.
+# FOR UPDATE SKIP LOCKED lets concurrent workers on PostgreSQL pass over each
+# other's rows instead of queueing behind them; SQLite has no row locks and
+# compiles it away, but runs the whole UPDATE under its single write lock, so
+# two workers still never claim the same job.
+def claim(worker_id, limit=1):
+    now = utcnow()
+    due = (
+        select(jobs.c.job_id)
+        .where(jobs.c.status == 'queued', jobs.c.run_at <= now)
+        .order_by(jobs.c.run_at, jobs.c.job_id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    claimed = db.session.execute(
+        update(jobs)
+        .where(jobs.c.job_id.in_(due.scalar_subquery()), jobs.c.status == 'queued')
+        .values(status='running', locked_by=worker_id, started_at=now, attempts=jobs.c.attempts + 1)
+        .returning(jobs.c.job_id, jobs.c.name, jobs.c.payload, jobs.c.attempts, jobs.c.max_attempts)
+    ).all()
+    db.session.commit()
+    return claimed
+
+
+# Seconds before retry number `attempts`: exponential, capped, with jitter so
+# jobs that failed together don't all come back together
+def retry_delay(attempts):
+    delay = min(current_app.config['JOB_RETRY_BASE'] * 2 ** (attempts - 1), current_app.config['JOB_RETRY_MAX'])
+    return delay * random.uniform(1, 1.25)
+
+
+# Run one claimed job and record the outcome. The task's own writes commit
+# together with marking the job done.
+def run_job(job):
+    try:
+        if job.name not in TASKS:
+            raise LookupError(f'No task registered as {job.name!r}')
+        TASKS[job.name](**json.loads(job.payload))
+    except Exception as error:
+        db.session.rollback()
+        _fail(job, error)
+        return False
+    db.session.execute(
+        update(jobs).where(jobs.c.job_id == job.job_id)
+        .values(status='done', finished_at=utcnow(), locked_by=None, last_error=None)
+    )
+    db.session.commit()
+    return True
+
+
+def _fail(job, error):
+    now = utcnow()
+    values = {"locked_by": None, "last_error": f'{type(error).__name__}: {error}'}
+    if job.attempts >= job.max_attempts:
+        values.update(status='failed', finished_at=now)
+        current_app.logger.error('Job %d (%s) failed for good after %d attempts: %s', job.job_id, job.name, job.attempts, error)
+    else:
+        values.update(status='queued', run_at=now + timedelta(seconds=retry_delay(job.attempts)))
+        current_app.logger.warning('Job %d (%s) failed on attempt %d, will retry: %s', job.job_id, job.name, job.attempts, error)
+    db.session.execute(update(jobs).where(jobs.c.job_id == job.job_id).values(values))
+    db.session.commit()
+
+
+# Jobs left running by a worker that died get another attempt, or fail if
+# they have used them all. Returns how many were recovered.
+def requeue_stale(timeout):
+    now = utcnow()
+    stale = (jobs.c.status == 'running') & (jobs.c.started_at < now - timedelta(seconds=timeout))
+    failed = db.session.execute(
+        update(jobs).where(stale, jobs.c.attempts >= jobs.c.max_attempts)
+        .values(status='failed', finished_at=now, locked_by=None, last_error='Worker stopped while running the job')
+    ).rowcount
+    requeued = db.session.execute(
+        update(jobs).where(stale).values(status='queued', run_at=now, locked_by=None)
+    ).rowcount
+    db.session.commit()
+    return failed + requeued
+
+
+def purge_done(retention):
+    deleted = db.session.execute(
+        delete(jobs).where(jobs.c.status == 'done', jobs.c.finished_at < utcnow() - timedelta(seconds=retention))
+    ).rowcount
+    db.session.commit()
+    return deleted
+
+
+# Queue depth by status, lag (age of the oldest job that is due but not yet
+# claimed) and jobs finished in the last `window` seconds
+def queue_stats(window=60):
+    now = utcnow()
+    counts = dict(db.session.execute(select(jobs.c.status, func.count()).group_by(jobs.c.status)).all())
+    oldest_due = db.session.execute(
+        select(func.min(jobs.c.run_at)).where(jobs.c.status == 'queued', jobs.c.run_at <= now)
+    ).scalar()
+    finished = db.session.execute(
+        select(func.count()).select_from(jobs)
+        .where(jobs.c.status == 'done', jobs.c.finished_at >= now - timedelta(seconds=window))
+    ).scalar()
+    stats = {status: counts.get(status, 0) for status in ('queued', 'running', 'done', 'failed')}
+    stats["lag_seconds"] = (now - oldest_due).total_seconds() if oldest_due else 0.0
+    stats["finished_recently"] = finished
+    return stats
+
+
+# Hand claimed jobs that never started back to the queue, without using up
+# an attempt
+def release(job_ids):
+    db.session.execute(
+        update(jobs).where(jobs.c.job_id.in_(job_ids), jobs.c.status == 'running')
+        .values(status='queued', attempts=jobs.c.attempts - 1, locked_by=None, started_at=None)
+    )
+    db.session.commit()
+
+
+# One worker thread: claim a batch, run it, repeat, sleeping poll_interval
+# whenever nothing is due. With burst it returns instead of sleeping.
+def _work(app, worker_id, stop, poll_interval, burst, processed):
+    with app.app_context():
+        while not stop.is_set():
+            try:
+                claimed = claim(worker_id, limit=app.config['JOB_CLAIM_BATCH'])
+            except Exception:
+                db.session.rollback()
+                app.logger.exception('Worker %s could not claim jobs', worker_id)
+                stop.wait(poll_interval)
+                continue
+            if not claimed:
+                if burst:
+                    return
+                stop.wait(poll_interval)
+                continue
+            for index, job in enumerate(claimed):
+                if stop.is_set():
+                    release([job.job_id for job in claimed[index:]])
+                    return
+                ok = run_job(job)
+                with processed["lock"]:
+                    processed["done" if ok else "failed"] += 1
+
+
+jobs_cli = AppGroup('jobs', help='Run and inspect background jobs.')
+
+
+# Runs until SIGTERM/SIGINT, which lets every thread finish its current job
+# before exiting. Stale jobs are requeued and old finished ones purged every
+# maintenance interval.
+@jobs_cli.command('work')
+@click.option('--concurrency', type=int, default=None, help='Worker threads (default JOB_CONCURRENCY).')
+@click.option('--poll-interval', type=float, default=None, help='Seconds between polls of an empty queue.')
+@click.option('--burst', is_flag=True, help='Exit once no job is due instead of waiting for more.')
+def work_command(concurrency, poll_interval, burst):
+    app = current_app._get_current_object()
+    concurrency = concurrency or app.config['JOB_CONCURRENCY']
+    poll_interval = poll_interval or app.config['JOB_POLL_INTERVAL']
+    stop = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *args: stop.set())
+
+    processed = {"done": 0, "failed": 0, "lock": threading.Lock()}
+    prefix = f'{socket.gethostname()}:{os.getpid()}'
+    threads = [
+        threading.Thread(
+            target=_work, args=(app, f'{prefix}:{index}', stop, poll_interval, burst, processed),
+            name=f'job-worker-{index}'
+        )
+        for index in range(concurrency)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    click.echo(f'Working with {concurrency} threads as {prefix}.')
+
+    maintenance_due = 0
+    while any(thread.is_alive() for thread in threads):
+        if time.monotonic() >= maintenance_due:
+            recovered = requeue_stale(app.config['JOB_TIMEOUT'])
+            if recovered:
+                app.logger.warning('Recovered %d jobs from stopped workers', recovered)
+            purge_done(app.config['JOB_RETENTION'])
+            maintenance_due = time.monotonic() + app.config['JOB_MAINTENANCE_INTERVAL']
+        stop.wait(1)
+    for thread in threads:
+        thread.join()
+
+    elapsed = time.perf_counter() - started
+    total = processed["done"] + processed["failed"]
+    click.echo(f'Ran {total} jobs ({processed["failed"]} failed) in {elapsed:.1f}s, {total / elapsed:.1f} jobs/s.')
+
+
+@jobs_cli.command('stats')
+def stats_command():
+    stats = queue_stats()
+    click.echo(
+        f'queued={stats["queued"]} running={stats["running"]} done={stats["done"]} failed={stats["failed"]} '
+        f'lag={stats["lag_seconds"]:.1f}s finished_last_minute={stats["finished_recently"]}'
+    )
+
+
+# Give failed jobs a fresh set of attempts, e.g. after fixing what broke them
+@jobs_cli.command('retry')
+@click.option('--name', default=None, help='Only retry jobs of this task.')
+def retry_command(name):
+    stmt = update(jobs).where(jobs.c.status == 'failed')
+    if name:
+        stmt = stmt.where(jobs.c.name == name)
+    retried = db.session.execute(
+        stmt.values(status='queued', attempts=0, run_at=utcnow(), finished_at=None)
+    ).rowcount
+    db.session.commit()
+    click.echo(f'Requeued {retried} failed jobs.')
@@ -0,0 +1,399 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+from flask import current_app
+from werkzeug.utils import import_string
+
+from app.metrics import LLM_CALL_SECONDS
+
+# Generation settings shared by every ai_search call
+CHAT_OPTIONS = {
+    "model": "deepseek-r1-distill-llama-70b",
+    "temperature": 0.5,
+    "max_completion_tokens": 1024,
+    "top_p": 1,
+}
+
+
+# Completion text that also carries the provider's token usage
+class Completion(str):
+    prompt_tokens = None
+    completion_tokens = None
+
+
+def estimate_tokens(text):
+    return -(-len(text) // 4)
+
+
+# (prompt, completion) token counts of one call: what the provider reported,
+# or about four characters per token for streams and backends that don't
+def token_usage(messages, completion):
+    prompt_tokens = getattr(completion, 'prompt_tokens', None)
+    if prompt_tokens is None:
+        prompt_tokens = sum(estimate_tokens(message["content"]) for message in messages)
+    completion_tokens = getattr(completion, 'completion_tokens', None)
+    if completion_tokens is None:
+        completion_tokens = estimate_tokens(completion)
+    return prompt_tokens, completion_tokens
+
+
+# Interface every LLM backend implements: a full completion, or the same
+# completion as an iterator of text chunks
+class LLMBackend:
+    def complete(self, messages):
+        raise NotImplementedError
+
+    def stream(self, messages):
+        raise NotImplementedError
+
+
+# Groq chat completions API
+class GroqBackend(LLMBackend):
+    def __init__(self, client, options=None, timeout=None):
+        self.client = client
+        self.options = dict(CHAT_OPTIONS, **(options or {}))
+        # Let the HTTP call itself give up near the executor deadline so
+        # timed-out calls don't keep a worker busy
+        if timeout:
+            self.options['timeout'] = timeout
+
+    def complete(self, messages):
+        chat_completion = self.client.chat.completions.create(messages=messages, stream=False, **self.options)
+        completion = Completion(chat_completion.choices[0].message.content.strip())
+        if chat_completion.usage is not None:
+            completion.prompt_tokens = chat_completion.usage.prompt_tokens
+            completion.completion_tokens = chat_completion.usage.completion_tokens
+        return completion
+
+    def stream(self, messages):
+        for chunk in self.client.chat.completions.create(messages=messages, stream=True, **self.options):
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
+
+
+# Deterministic local backend for development, load tests and benchmarks.
+# Replays a canned answer in fixed-size chunks on a configurable schedule.
+class FakeLLMBackend(LLMBackend):
+    DEFAULT_RESPONSE = '{"insights": "This is a canned answer from the fake LLM backend.", "service_ids": []}'
+
+    def __init__(self, response=None, chunk_size=8, first_token_delay=0.0, chunk_delay=0.0):
+        self.response = response or self.DEFAULT_RESPONSE
+        self.chunk_size = chunk_size
+        self.first_token_delay = first_token_delay
+        self.chunk_delay = chunk_delay
+
+    def answer(self, messages):
+        return self.response(messages) if callable(self.response) else self.response
+
+    def complete(self, messages):
+        time.sleep(self.first_token_delay + self.chunk_delay * max(0, self._chunk_count(messages) - 1))
+        return self.answer(messages).strip()
+
+    def stream(self, messages):
+        text = self.answer(messages)
+        time.sleep(self.first_token_delay)
+        for start in range(0, len(text), self.chunk_size):
+            if start:
+                time.sleep(self.chunk_delay)
+            yield text[start:start + self.chunk_size]
+
+    def _chunk_count(self, messages):
+        return -(-len(self.answer(messages)) // self.chunk_size)
+
+
+# Providers selectable with LLM_BACKEND. Each factory takes the app config and
+# imports its SDK itself, so processes that never call the LLM never pay for it.
+# LLM_BACKEND may also be the import path of a factory, e.g. 'mypkg.llm:build'.
+def build_groq_backend(config):
+    if not config.get('GROQ_API_KEY'):
+        raise LLMNotConfigured("GROQ_API_KEY is not set; the AI assistant is disabled.")
+    from groq import Groq
+    return GroqBackend(
+        Groq(api_key=config['GROQ_API_KEY']),
+        options={"model": config['LLM_MODEL']},
+        timeout=config['LLM_TIMEOUT'],
+    )
+
+
+def build_fake_backend(config):
+    return FakeLLMBackend(
+        first_token_delay=config['FAKE_LLM_FIRST_TOKEN_DELAY'],
+        chunk_delay=config['FAKE_LLM_CHUNK_DELAY'],
+    )
+
+
+LLM_PROVIDERS = {
+    'groq': build_groq_backend,
+    'fake': build_fake_backend,
+}
+
+_backend_lock = threading.Lock()
+
+
+# Backend used by ai_search, built on first use from LLM_BACKEND. An app can
+# also install its own instance under app.extensions['llm_backend'].
+def get_llm_backend():
+    backend = current_app.extensions.get('llm_backend')
+    if backend is not None:
+        return backend
+    with _backend_lock:
+        backend = current_app.extensions.get('llm_backend')
+        if backend is None:
+            name = current_app.config['LLM_BACKEND']
+            factory = LLM_PROVIDERS.get(name) or import_string(name.replace(':', '.'))
+            backend = current_app.extensions['llm_backend'] = factory(current_app.config)
+    return backend
+
+
+# Raised instead of calling the provider; each maps to a fast HTTP error
+class LLMUnavailable(Exception):
+    status_code = 503
+    retry_after = 1
+
+
+class LLMRateLimited(LLMUnavailable):
+    status_code = 429
+
+
+class LLMOverloaded(LLMUnavailable):
+    pass
+
+
+class LLMCircuitOpen(LLMUnavailable):
+    pass
+
+
+class LLMTimeout(LLMUnavailable):
+    status_code = 504
+
+
+class LLMNotConfigured(LLMUnavailable):
+    retry_after = None
+
+
+# Token bucket admission control: rate tokens per second, up to capacity
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+
+# Opens after failure_threshold consecutive failures and rejects calls until
+# reset_timeout has passed; then lets a single trial call through (half-open)
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    # The trial call allow() let through was turned away before it ran; wait a
+    # full cooldown before trying again instead of staying half-open for good
+    def abandon_trial(self):
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+_DONE = object()
+
+
+# Runs LLM calls on a dedicated, bounded worker pool so a slow provider can
+# only ever tie up these threads, never the web workers. Calls are admitted
+# through a token bucket and a circuit breaker, wait in a bounded queue, and
+# are abandoned by the caller once their deadline passes.
+class LLMExecutor:
+    def __init__(self, workers=4, queue_size=16, timeout=30, rate=5, burst=10, breaker=None):
+        self.workers = workers
+        self.timeout = timeout
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = breaker or CircuitBreaker()
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._threads = []
+        self._pid = None
+        self._lock = threading.Lock()
+        self.counters = {"admitted": 0, "rate_limited": 0, "overloaded": 0, "circuit_open": 0, "timeouts": 0, "failures": 0}
+
+    # Threads don't survive fork(), so (re)start them lazily in each process
+    def _ensure_workers(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._threads = [
+                threading.Thread(target=self._work, name=f'llm-worker-{index}', daemon=True)
+                for index in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+            self._pid = os.getpid()
+
+    def _work(self):
+        while True:
+            future, fn, args = self._queue.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            started = time.perf_counter()
+            try:
+                result = fn(*args)
+            except BaseException as e:
+                LLM_CALL_SECONDS.observe(time.perf_counter() - started, outcome='error')
+                if self._settle(future):
+                    self.breaker.record_failure()
+                    self.counters["failures"] += 1
+                future.set_exception(e)
+            else:
+                LLM_CALL_SECONDS.observe(time.perf_counter() - started, outcome='ok')
+                if self._settle(future):
+                    self.breaker.record_success()
+                future.set_result(result)
+
+    # Every call reaches the breaker once. A call the caller gave up on has
+    # already counted as a failure, whatever the worker sees afterwards.
+    def _settle(self, future):
+        with self._lock:
+            if future.settled:
+                return False
+            future.settled = True
+            return True
+
+    # Cheap rejections come first, so a half-open breaker's trial call is
+    # only admitted once it can actually be queued
+    def _submit(self, fn, *args):
+        if not self.bucket.try_acquire():
+            self.counters["rate_limited"] += 1
+            raise LLMRateLimited("Too many AI requests; slow down.")
+        if self._queue.full():
+            self.counters["overloaded"] += 1
+            raise LLMOverloaded("The AI assistant is busy; try again shortly.")
+        if not self.breaker.allow():
+            self.counters["circuit_open"] += 1
+            raise LLMCircuitOpen("The AI provider is failing; try again shortly.")
+
+        self._ensure_workers()
+        future = Future()
+        future.settled = False
+        try:
+            self._queue.put_nowait((future, fn, args))
+        except queue.Full:
+            # Filled up since the check above
+            self.breaker.abandon_trial()
+            self.counters["overloaded"] += 1
+            raise LLMOverloaded("The AI assistant is busy; try again shortly.")
+        self.counters["admitted"] += 1
+        return future
+
+    def _timed_out(self, future):
+        future.cancel()
+        self.counters["timeouts"] += 1
+        if self._settle(future):
+            self.breaker.record_failure()
+        return LLMTimeout("The AI provider did not answer in time.")
+
+    def complete(self, backend, messages):
+        future = self._submit(backend.complete, messages)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            raise self._timed_out(future)
+
+    # Streams chunks produced on a worker thread back to the caller. Admission
+    # happens here, before the first chunk is requested; the whole stream then
+    # shares one deadline, past which the worker is told to stop.
+    def stream(self, backend, messages):
+        chunks = queue.Queue()
+        cancelled = threading.Event()
+
+        def produce():
+            try:
+                for chunk in backend.stream(messages):
+                    if cancelled.is_set():
+                        break
+                    chunks.put(chunk)
+            finally:
+                chunks.put(_DONE)
+
+        future = self._submit(produce)
+        return self._drain(future, chunks, cancelled)
+
+    def _drain(self, future, chunks, cancelled):
+        deadline = time.monotonic() + self.timeout
+        try:
+            while True:
+                try:
+                    chunk = chunks.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    raise self._timed_out(future)
+                if chunk is _DONE:
+                    break
+                yield chunk
+            # Surface a provider error raised mid-stream
+            future.result()
+        finally:
+            cancelled.set()
+
+    def stats(self):
+        return dict(self.counters, queued=self._queue.qsize(), breaker=self.breaker.state)
+
+
+# Executor configured for this app
+def get_llm_executor():
+    return current_app.extensions['llm_executor']
+
+
+def init_app(app):
+    config = app.config
+    app.extensions['llm_executor'] = LLMExecutor(
+        workers=config['LLM_WORKERS'],
+        queue_size=config['LLM_QUEUE_SIZE'],
+        timeout=config['LLM_TIMEOUT'],
+        rate=config['LLM_RATE_LIMIT'],
+        burst=config['LLM_RATE_BURST'],
+        breaker=CircuitBreaker(config['LLM_BREAKER_FAILURES'], config['LLM_BREAKER_RESET']),
+    )
@@ -0,0 +1,68 @@
+from collections import deque
+
+
+# Aho-Corasick automaton: finds every occurrence of many patterns in a single
+# left-to-right pass, independent of how many patterns there are
+class AhoCorasick:
+    def __init__(self, patterns):
+        # patterns maps each (lowercased) pattern to the value reported on a match
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [None]
+        self._dict_link = [0]
+
+        for pattern, value in patterns.items():
+            if pattern:
+                self._insert(pattern, value)
+        self._link()
+
+    def _insert(self, pattern, value):
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(None)
+                self._dict_link.append(0)
+            state = next_state
+        self._output[state] = value
+
+    # Breadth-first pass computing failure links and, for each state, the
+    # nearest state down its failure chain that ends a pattern
+    def _link(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                link = self._fail[child]
+                self._dict_link[child] = link if self._output[link] is not None else self._dict_link[link]
+
+    # Advance from state over text, returning the new state and the values of
+    # every pattern that ended along the way. Callers can keep the state to
+    # match across chunk boundaries of a stream.
+    def feed(self, text, state=0):
+        goto, fail, output, dict_link = self._goto, self._fail, self._output, self._dict_link
+        found = []
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state] is not None:
+                found.append(output[state])
+            link = dict_link[state]
+            while link:
+                found.append(output[link])
+                link = dict_link[link]
+        return state, found
+
+    def find_all(self, text):
+        return self.feed(text)[1]
@@ -0,0 +1,133 @@
+import math
+import threading
+
+# Seconds; suits both sub-millisecond queries and multi-second LLM calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels
+    )
+    return '{' + pairs + '}'
+
+
+# A named family of samples keyed by label values
+class Metric:
+    type = 'untyped'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple((name, labels.get(name, '')) for name in self.labels)
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.type}']
+        for name, labels, value in self.samples():
+            lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type = 'gauge'
+
+
+# Cumulative histogram in the Prometheus exposition format
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry["buckets"][index] += 1
+                    break
+            entry["sum"] += value
+            entry["count"] += 1
+
+    def samples(self):
+        with self._lock:
+            values = [(key, dict(entry, buckets=list(entry["buckets"]))) for key, entry in self._values.items()]
+        samples = []
+        for key, entry in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets, entry["buckets"]):
+                cumulative += count
+                samples.append((f'{self.name}_bucket', key + (('le', _format_value(bound)),), cumulative))
+            samples.append((f'{self.name}_sum', key, entry["sum"]))
+            samples.append((f'{self.name}_count', key, entry["count"]))
+        return samples
+
+
+# Metrics of this process. Metrics built at scrape time from state kept
+# elsewhere, such as cache and executor stats, are passed to render().
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self.register(Counter(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def render(self, extra=()):
+        metrics = [*self._metrics, *extra]
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+registry = Registry()
+
+REQUEST_SECONDS = registry.histogram(
+    'http_request_duration_seconds', 'Time to produce a response, by endpoint.', ('endpoint', 'method')
+)
+REQUESTS = registry.counter('http_requests_total', 'Responses sent, by endpoint and status.', ('endpoint', 'method', 'status'))
+DB_STATEMENTS = registry.counter('db_statements_total', 'SQL statements executed, by endpoint.', ('endpoint',))
+DB_SECONDS = registry.counter('db_statement_seconds_total', 'Time spent executing SQL, by endpoint.', ('endpoint',))
+RENDER_SECONDS = registry.counter('template_render_seconds_total', 'Time spent rendering templates, by endpoint.', ('endpoint',))
+LLM_CALL_SECONDS = registry.histogram(
+    'llm_call_duration_seconds', 'Time an LLM worker spent on one call, including streamed calls.', ('outcome',)
+)
@@ -1,5 +1,11 @@
 from app.extensions import db
 
+# Strategy for relationships no hot path walks. With RAISE_ON_LAZY_LOAD,
+# app.instrumentation turns an accidental lazy load of one of them (the first
+# query of an N+1) into an error; paths that do need a relationship load it
+# eagerly with selectinload/joinedload.
+LAZY_LOAD = 'select'
+
 class User(db.Model):
     __tablename__ = 'users'
     user_id = db.Column(db.Integer, primary_key=True)
@@ -7,11 +13,11 @@ class User(db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(255), nullable=False)
     
-    orders = db.relationship('Order', backref='user', lazy=True)
-    bookings = db.relationship('Booking', backref='user', lazy=True)
-    payments = db.relationship('Payment', backref='user', lazy=True)
-    wishlist = db.relationship('Wishlist', backref='user', lazy=True)
-    chat_logs = db.relationship('ChatLog', backref='user', lazy=True)
+    orders = db.relationship('Order', backref=db.backref('user', lazy=LAZY_LOAD), lazy=LAZY_LOAD, passive_deletes=True)
+    bookings = db.relationship('Booking', backref=db.backref('user', lazy=LAZY_LOAD), lazy=LAZY_LOAD, passive_deletes=True)
+    payments = db.relationship('Payment', backref=db.backref('user', lazy=LAZY_LOAD), lazy=LAZY_LOAD)
+    wishlist = db.relationship('Wishlist', backref=db.backref('user', lazy=LAZY_LOAD), lazy=LAZY_LOAD, passive_deletes=True)
+    chat_logs = db.relationship('ChatLog', backref=db.backref('user', lazy=LAZY_LOAD), lazy=LAZY_LOAD, passive_deletes=True)
 
 class Supplier(db.Model):
     __tablename__ = 'suppliers'
@@ -19,22 +25,35 @@ class Supplier(db.Model):
     name = db.Column(db.String(150), nullable=False)
     company_description = db.Column(db.Text, nullable=True)
     
-    products = db.relationship('Product', backref='supplier', lazy=True)
-    services = db.relationship('SupplierService', backref='supplier', lazy=True)
-    service_responses = db.relationship('ServiceResponse', backref='supplier', lazy=True)
+    products = db.relationship('Product', backref=db.backref('supplier', lazy=LAZY_LOAD), lazy=LAZY_LOAD, passive_deletes=True)
+    services = db.relationship('SupplierService', backref=db.backref('supplier', lazy=LAZY_LOAD), lazy=LAZY_LOAD, passive_deletes=True)
+    service_responses = db.relationship('ServiceResponse', backref=db.backref('supplier', lazy=LAZY_LOAD), lazy=LAZY_LOAD, passive_deletes=True)
 
 class SupplierService(db.Model):
     __tablename__ = 'supplier_services'
     service_id = db.Column(db.Integer, primary_key=True)
-    supplier_id = db.Column(db.Integer, db.ForeignKey('suppliers.supplier_id', ondelete="CASCADE"), nullable=False)
+    supplier_id = db.Column(db.Integer, db.ForeignKey('suppliers.supplier_id', ondelete="CASCADE"), nullable=False, index=True)
     service_name = db.Column(db.String(255), nullable=False)
     service_description = db.Column(db.Text, nullable=False)
     accreditation = db.Column(db.String(255), nullable=True)
+    # Validator for conditional GETs and cached fragments; also set on bulk inserts
+    updated_at = db.Column(db.DateTime, nullable=False, default=db.func.now(), onupdate=db.func.now(), server_default=db.func.now(), index=True)
 
-    requests = db.relationship('ServiceRequest', backref='service', lazy=True)
+    requests = db.relationship('ServiceRequest', backref=db.backref('service', lazy=LAZY_LOAD), lazy=LAZY_LOAD, passive_deletes=True)
 
 class Product(db.Model):
     __tablename__ = 'products'
+    __table_args__ = (
+        # Product browsing: each filter walks its own index in product_id
+        # order, so keyset pages stay cheap however large the catalog
+        db.Index('ix_products_supplier_id_product_id', 'supplier_id', 'product_id'),
+        db.Index('ix_products_accreditation_product_id', 'accreditation', 'product_id'),
+        db.Index('ix_products_price_product_id', 'price', 'product_id'),
+        db.Index(
+            'ix_products_in_stock_product_id', 'product_id',
+            postgresql_where=db.text('stock > 0'), sqlite_where=db.text('stock > 0')
+        ),
+    )
     product_id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(255), nullable=False)
     price = db.Column(db.Float, nullable=False)
@@ -43,71 +62,144 @@ class Product(db.Model):
     accreditation = db.Column(db.String(255), nullable=True)
     supplier_id = db.Column(db.Integer, db.ForeignKey('suppliers.supplier_id', ondelete="CASCADE"), nullable=False)
     
-    orders = db.relationship('Order', backref='product', lazy=True)
-    wishlist = db.relationship('Wishlist', backref='product', lazy=True)
-    images = db.relationship('ProductImage', backref='product', lazy=True)
+    orders = db.relationship('Order', backref=db.backref('product', lazy=LAZY_LOAD), lazy=LAZY_LOAD, passive_deletes=True)
+    wishlist = db.relationship('Wishlist', backref=db.backref('product', lazy=LAZY_LOAD), lazy=LAZY_LOAD, passive_deletes=True)
+    # Product pages and listings always show images: one extra IN query per page
+    images = db.relationship('ProductImage', backref=db.backref('product', lazy=LAZY_LOAD), lazy='selectin', passive_deletes=True)
 
 class ServiceRequest(db.Model):
     __tablename__ = 'service_requests'
+    __table_args__ = (
+        # Serves the service_id foreign key and view_requests' keyset pages
+        db.Index('ix_service_requests_service_id_request_id', 'service_id', 'request_id'),
+        # my_requests: one requester's history, newest first
+        db.Index('ix_service_requests_email_request_id', 'email', 'request_id'),
+    )
     request_id = db.Column(db.Integer, primary_key=True)
     service_id = db.Column(db.Integer, db.ForeignKey('supplier_services.service_id', ondelete="CASCADE"), nullable=False)
     user_name = db.Column(db.String(100), nullable=False)
     phone_number = db.Column(db.String(20), nullable=False)
     email = db.Column(db.String(120), nullable=False)
     research_description = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now(), index=True)
 
-    responses = db.relationship('ServiceResponse', backref='service_request', lazy=True)
+    responses = db.relationship('ServiceResponse', backref=db.backref('service_request', lazy=LAZY_LOAD), lazy=LAZY_LOAD, passive_deletes=True)
 
 class ServiceResponse(db.Model):
     __tablename__ = 'service_responses'
+    __table_args__ = (
+        # Serves the request_id foreign key and the latest-response lookup
+        db.Index('ix_service_responses_request_id_response_id', 'request_id', 'response_id'),
+    )
     response_id = db.Column(db.Integer, primary_key=True)
     request_id = db.Column(db.Integer, db.ForeignKey('service_requests.request_id', ondelete="CASCADE"), nullable=False)
-    supplier_id = db.Column(db.Integer, db.ForeignKey('suppliers.supplier_id', ondelete="CASCADE"), nullable=False)
+    supplier_id = db.Column(db.Integer, db.ForeignKey('suppliers.supplier_id', ondelete="CASCADE"), nullable=False, index=True)
     response_details = db.Column(db.Text, nullable=False)
     price = db.Column(db.Float, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
+
+# Product counts per facet value (supplier, accreditation, stock, price band),
+# kept current by app.products as products are written
+class ProductFacet(db.Model):
+    __tablename__ = 'product_facets'
+    __table_args__ = (
+        # Most common values of one facet first
+        db.Index('ix_product_facets_facet_count', 'facet', 'count'),
+    )
+    facet = db.Column(db.String(32), primary_key=True)
+    value = db.Column(db.String(255), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+# Per-service request counts by status, kept current by app.request_stats in
+# the same transaction as each request, response and delete
+class ServiceRequestStats(db.Model):
+    __tablename__ = 'service_request_stats'
+    service_id = db.Column(db.Integer, db.ForeignKey('supplier_services.service_id', ondelete="CASCADE"), primary_key=True)
+    pending = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    responded = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rejected = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
 class Order(db.Model):
     __tablename__ = 'orders'
     order_id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id', ondelete="CASCADE"), nullable=False)
-    product_id = db.Column(db.Integer, db.ForeignKey('products.product_id', ondelete="CASCADE"), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id', ondelete="CASCADE"), nullable=False, index=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.product_id', ondelete="CASCADE"), nullable=False, index=True)
     
-    payments = db.relationship('Payment', backref='order', lazy=True)
-    tracking_updates = db.relationship('TrackingUpdate', backref='order', lazy=True)
+    payments = db.relationship('Payment', backref=db.backref('order', lazy=LAZY_LOAD), lazy=LAZY_LOAD, passive_deletes=True)
+    # Order status views list the tracking history
+    tracking_updates = db.relationship('TrackingUpdate', backref=db.backref('order', lazy=LAZY_LOAD), lazy='selectin', passive_deletes=True)
 
 class Payment(db.Model):
     __tablename__ = 'payments'
     payment_id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
-    order_id = db.Column(db.Integer, db.ForeignKey('orders.order_id', ondelete="CASCADE"), nullable=True)
-    booking_id = db.Column(db.Integer, db.ForeignKey('bookings.booking_id', ondelete="CASCADE"), nullable=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False, index=True)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.order_id', ondelete="CASCADE"), nullable=True, index=True)
+    booking_id = db.Column(db.Integer, db.ForeignKey('bookings.booking_id', ondelete="CASCADE"), nullable=True, index=True)
 
 class Booking(db.Model):
     __tablename__ = 'bookings'
     booking_id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id', ondelete="CASCADE"), nullable=False)
-    service_id = db.Column(db.Integer, db.ForeignKey('supplier_services.service_id', ondelete="CASCADE"), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id', ondelete="CASCADE"), nullable=False, index=True)
+    service_id = db.Column(db.Integer, db.ForeignKey('supplier_services.service_id', ondelete="CASCADE"), nullable=False, index=True)
 
 class Wishlist(db.Model):
     __tablename__ = 'wishlist'
     wishlist_id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id', ondelete="CASCADE"), nullable=False)
-    product_id = db.Column(db.Integer, db.ForeignKey('products.product_id', ondelete="CASCADE"), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id', ondelete="CASCADE"), nullable=False, index=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.product_id', ondelete="CASCADE"), nullable=False, index=True)
 
 class ProductImage(db.Model):
     __tablename__ = 'product_images'
     image_id = db.Column(db.Integer, primary_key=True)
-    product_id = db.Column(db.Integer, db.ForeignKey('products.product_id', ondelete="CASCADE"), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.product_id', ondelete="CASCADE"), nullable=False, index=True)
     image_url = db.Column(db.String(255), nullable=False)
 
 class TrackingUpdate(db.Model):
     __tablename__ = 'tracking_updates'
     update_id = db.Column(db.Integer, primary_key=True)
-    order_id = db.Column(db.Integer, db.ForeignKey('orders.order_id', ondelete="CASCADE"), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.order_id', ondelete="CASCADE"), nullable=False, index=True)
     status = db.Column(db.String(255), nullable=False)
 
+# Append-only AI assistant history, written in batches by app.chat_log.
+# Visitors without an account are identified by a random client_id kept in
+# their session.
 class ChatLog(db.Model):
     __tablename__ = 'chat_logs'
+    __table_args__ = (
+        # History pages, newest first, in constant time however long the history
+        db.Index('ix_chat_logs_user_id_chat_id', 'user_id', 'chat_id'),
+        db.Index('ix_chat_logs_client_id_chat_id', 'client_id', 'chat_id'),
+    )
     chat_id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id', ondelete="CASCADE"), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id', ondelete="CASCADE"), nullable=True)
+    client_id = db.Column(db.String(32), nullable=True)
+    role = db.Column(db.String(16), nullable=False, server_default='user')  # 'user' or 'assistant'
     message = db.Column(db.Text, nullable=False)
+    latency_ms = db.Column(db.Float, nullable=True)
+    prompt_tokens = db.Column(db.Integer, nullable=True)
+    completion_tokens = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
+
+# Durable background jobs, claimed by flask jobs work. Rows are inserted in
+# the transaction of the change that needs them, so a job exists if and only
+# if that change committed.
+class Job(db.Model):
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        # Claiming the next due jobs and measuring queue lag
+        db.Index('ix_jobs_status_run_at', 'status', 'run_at'),
+        # Throughput and purging of finished jobs
+        db.Index('ix_jobs_status_finished_at', 'status', 'finished_at'),
+    )
+    job_id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}')  # JSON keyword arguments
+    status = db.Column(db.String(16), nullable=False, default='queued')  # queued, running, done or failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
+    created_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    locked_by = db.Column(db.String(64), nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
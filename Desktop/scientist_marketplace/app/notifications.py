@@ -0,0 +1,47 @@
+from flask import current_app
+from sqlalchemy import select
+
+from app.extensions import db
+from app.jobs import task
+from app.models import ServiceRequest, ServiceResponse, Supplier, SupplierService
+
+# The marketplace has no mail transport yet, so notifications are written to
+# the application log by the job worker. Jobs run at least once: a job whose
+# worker died is retried, so sending must tolerate repeats.
+
+
+# Tell a service's supplier about a new request
+@task('notify_supplier')
+def notify_supplier(request_id):
+    row = db.session.execute(
+        select(ServiceRequest.user_name, ServiceRequest.email, SupplierService.service_name, Supplier.name)
+        .join(SupplierService, SupplierService.service_id == ServiceRequest.service_id)
+        .join(Supplier, Supplier.supplier_id == SupplierService.supplier_id)
+        .where(ServiceRequest.request_id == request_id)
+    ).first()
+    if row is None:
+        # Deleted before the job ran; nothing left to announce
+        return
+    user_name, email, service_name, supplier_name = row
+    current_app.logger.info(
+        'Notify supplier %s: request %d for %s from %s <%s>', supplier_name, request_id, service_name, user_name, email
+    )
+
+
+# Tell a requester that their request was answered
+@task('notify_requester')
+def notify_requester(request_id):
+    row = db.session.execute(
+        select(ServiceRequest.email, SupplierService.service_name, ServiceResponse.response_details, ServiceResponse.price)
+        .join(SupplierService, SupplierService.service_id == ServiceRequest.service_id)
+        .join(ServiceResponse, ServiceResponse.request_id == ServiceRequest.request_id)
+        .where(ServiceRequest.request_id == request_id)
+        .order_by(ServiceResponse.response_id.desc())
+        .limit(1)
+    ).first()
+    if row is None:
+        return
+    email, service_name, details, price = row
+    current_app.logger.info(
+        'Notify requester <%s>: request %d for %s answered (%s, price %s)', email, request_id, service_name, details, price
+    )
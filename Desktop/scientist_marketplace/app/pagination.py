@@ -0,0 +1,81 @@
+from flask import current_app
+from itsdangerous import BadSignature, URLSafeSerializer
+
+from app.extensions import db
+
+NEXT = 'n'
+PREV = 'p'
+
+
+# One page of keyset-paginated rows plus opaque cursors for its neighbours
+class Page:
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def _serializer():
+    return URLSafeSerializer(current_app.config['SECRET_KEY'], salt='keyset-cursor')
+
+
+# Cursors are signed so clients can't hand-craft arbitrary key values
+def encode_cursor(direction, key):
+    return _serializer().dumps([direction, key])
+
+
+# A missing or tampered cursor simply restarts from the first page
+def decode_cursor(token):
+    if not token:
+        return NEXT, None
+    try:
+        direction, key = _serializer().loads(token)
+    except (BadSignature, TypeError, ValueError):
+        return NEXT, None
+    if direction not in (NEXT, PREV):
+        return NEXT, None
+    return direction, key
+
+
+# Paginate a select() on a unique, indexed key column without OFFSET.
+# The statement must select key_column (under its own name) and must not be
+# ordered or limited already.
+def keyset_paginate(stmt, key_column, cursor=None, per_page=None, descending=False):
+    per_page = per_page or current_app.config['PAGE_SIZE']
+    direction, key = decode_cursor(cursor)
+
+    # Walking "forward" in key order is the next page of an ascending list and
+    # the previous page of a descending one
+    forward = (direction == NEXT) != descending
+    if key is not None:
+        stmt = stmt.where(key_column > key if forward else key_column < key)
+    stmt = stmt.order_by(key_column.asc() if forward else key_column.desc())
+
+    rows = db.session.execute(stmt.limit(per_page + 1)).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if direction == PREV:
+        rows.reverse()
+
+    if not rows:
+        return Page([])
+
+    first_key = getattr(rows[0], key_column.key)
+    last_key = getattr(rows[-1], key_column.key)
+
+    if direction == NEXT:
+        has_next, has_prev = has_more, key is not None
+    else:
+        has_next, has_prev = True, has_more
+
+    return Page(
+        rows,
+        next_cursor=encode_cursor(NEXT, last_key) if has_next else None,
+        prev_cursor=encode_cursor(PREV, first_key) if has_prev else None,
+    )
@@ -0,0 +1,196 @@
+from collections import Counter
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import String, case, cast, delete, event, func, insert, inspect, literal, select, union_all
+from sqlalchemy.orm import Session
+
+from app.counters import increment
+from app.extensions import db
+from app.models import Product, ProductFacet
+
+FACETS = ('supplier', 'accreditation', 'in_stock', 'price')
+
+# Upper bounds of the price facet's bands; the last band is open-ended. The
+# migration that created product_facets backfilled with the same bands.
+PRICE_BANDS = (50, 100, 500, 1000, 5000)
+
+FACET_ATTRIBUTES = ('supplier_id', 'accreditation', 'stock', 'price')
+
+
+def price_band(price):
+    lower = 0
+    for upper in PRICE_BANDS:
+        if price < upper:
+            return f'{lower}-{upper}'
+        lower = upper
+    return f'{lower}+'
+
+
+# (facet, value) pairs a product with these attributes is counted under
+def facet_values(supplier_id, accreditation, stock, price):
+    values = [
+        ('supplier', str(supplier_id)),
+        ('in_stock', 'true' if stock is not None and stock > 0 else 'false'),
+        ('price', price_band(price)),
+    ]
+    if accreditation is not None:
+        values.append(('accreditation', accreditation))
+    return values
+
+
+# Add {(facet, value): delta} to the facet index in the session's transaction.
+# Rows are sorted so concurrent writers lock them in the same order.
+def adjust_facets(session, deltas):
+    rows = [
+        {"facet": facet, "value": value, "count": delta}
+        for (facet, value), delta in sorted(deltas.items()) if delta
+    ]
+    increment(session, ProductFacet.__table__, ('facet', 'value'), rows)
+
+
+# Count rows written with Core inserts (bulk imports), which the ORM hook
+# below never sees
+def record_inserted_products(rows):
+    deltas = Counter()
+    for row in rows:
+        deltas.update(facet_values(row["supplier_id"], row.get("accreditation"), row.get("stock"), row["price"]))
+    adjust_facets(db.session, deltas)
+
+
+# Facet attributes of a product as flushed now, or as they were before this
+# flush changed them
+def _attributes(product, before=False):
+    state = inspect(product)
+    values = []
+    for name in FACET_ATTRIBUTES:
+        history = state.attrs[name].history
+        values.append(history.deleted[0] if before and history.deleted else getattr(product, name))
+    return values
+
+
+# Setting an attribute of an expired product doesn't normally load the value
+# it replaces; active_history makes the ORM load it so the old facet values
+# can be taken out of the index
+def _keep_old_value(target, value, oldvalue, initiator):
+    pass
+
+
+for name in FACET_ATTRIBUTES:
+    event.listen(getattr(Product, name), 'set', _keep_old_value, active_history=True)
+
+
+# Products added, edited or deleted through the ORM move their facet counts in
+# the same transaction
+@event.listens_for(Session, 'after_flush')
+def _track_product_facets(session, flush_context):
+    deltas = Counter()
+    for product in session.new:
+        if isinstance(product, Product):
+            deltas.update(facet_values(*_attributes(product)))
+    for product in session.deleted:
+        if isinstance(product, Product):
+            deltas.subtract(facet_values(*_attributes(product, before=True)))
+    for product in session.dirty:
+        if isinstance(product, Product) and session.is_modified(product):
+            deltas.subtract(facet_values(*_attributes(product, before=True)))
+            deltas.update(facet_values(*_attributes(product)))
+    if any(deltas.values()):
+        adjust_facets(session, deltas)
+
+
+# Browse query for the given filters, ordered by product_id for keyset
+# pagination. Each filter is served by one of the products indexes.
+def browse_query(min_price=None, max_price=None, in_stock=None, accreditation=None, supplier_id=None):
+    stmt = select(Product.product_id, Product)
+    if min_price is not None:
+        stmt = stmt.where(Product.price >= min_price)
+    if max_price is not None:
+        stmt = stmt.where(Product.price <= max_price)
+    if in_stock is True:
+        stmt = stmt.where(Product.stock > 0)
+    elif in_stock is False:
+        stmt = stmt.where((Product.stock <= 0) | Product.stock.is_(None))
+    if accreditation is not None:
+        stmt = stmt.where(Product.accreditation == accreditation)
+    if supplier_id is not None:
+        stmt = stmt.where(Product.supplier_id == supplier_id)
+    return stmt
+
+
+# Catalog-wide counts of the most common values of every facet, in one read
+# of the facet index
+def facet_counts(limit):
+    per_facet = [
+        select(ProductFacet.facet, ProductFacet.value, ProductFacet.count)
+        .where(ProductFacet.facet == facet, ProductFacet.count > 0)
+        .order_by(ProductFacet.count.desc())
+        .limit(limit)
+        .subquery()
+        for facet in FACETS
+    ]
+    facets = {facet: {} for facet in FACETS}
+    for facet, value, count in db.session.execute(union_all(*(select(subquery) for subquery in per_facet))):
+        facets[facet][value] = count
+    return facets
+
+
+# JSON shape of a product in browse responses
+def product_to_dict(product):
+    return {
+        "id": product.product_id,
+        "name": product.name,
+        "price": product.price,
+        "stock": product.stock,
+        "in_stock": product.stock is not None and product.stock > 0,
+        "accreditation": product.accreditation,
+        "supplier_id": product.supplier_id,
+        "images": [image.image_url for image in product.images]
+    }
+
+
+# Facet counts recomputed from the products table
+def computed_facets():
+    in_stock = case((Product.stock > 0, 'true'), else_='false')
+    lower = 0
+    bands = []
+    for upper in PRICE_BANDS:
+        bands.append((Product.price < upper, f'{lower}-{upper}'))
+        lower = upper
+    band = case(*bands, else_=f'{lower}+')
+    stmt = union_all(
+        select(literal('supplier'), cast(Product.supplier_id, String), func.count()).group_by(Product.supplier_id),
+        select(literal('accreditation'), Product.accreditation, func.count())
+        .where(Product.accreditation.is_not(None)).group_by(Product.accreditation),
+        select(literal('in_stock'), in_stock, func.count()).group_by(in_stock),
+        select(literal('price'), band, func.count()).group_by(band),
+    )
+    return {(facet, value): count for facet, value, count in db.session.execute(stmt)}
+
+
+# Replace the facet index with freshly computed counts in one transaction and
+# return how many values had drifted
+def rebuild_facets(batch_size=5000):
+    expected = computed_facets()
+    stored = {(facet, value): count for facet, value, count in db.session.execute(
+        select(ProductFacet.facet, ProductFacet.value, ProductFacet.count).where(ProductFacet.count != 0)
+    )}
+    drifted = sum(1 for key in expected.keys() | stored.keys() if expected.get(key) != stored.get(key))
+
+    table = ProductFacet.__table__
+    db.session.execute(delete(table))
+    rows = [{"facet": facet, "value": value, "count": count} for (facet, value), count in expected.items()]
+    for start in range(0, len(rows), batch_size):
+        db.session.execute(insert(table), rows[start:start + batch_size])
+    db.session.commit()
+    return {"values": len(rows), "drifted": drifted}
+
+
+products_cli = AppGroup('products', help='Maintain the product facet index.')
+
+
+# Needed after products change outside the app, e.g. cascaded supplier deletes
+@products_cli.command('rebuild-facets')
+def rebuild_facets_command():
+    report = rebuild_facets()
+    click.echo(f'Rebuilt {report["values"]} facet values ({report["drifted"]} had drifted).')
@@ -0,0 +1,147 @@
+import json
+from contextlib import contextmanager
+from urllib.parse import quote
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import event, func, select
+
+from app.catalog import catalog_cache
+from app.extensions import db
+from app.models import Product, ServiceRequest, SupplierService
+
+# Hot read paths: (endpoint, URL template, tables the route may legitimately
+# walk). The first page of a keyset list reads the primary key in order with
+# a LIMIT, which both planners report as a scan of the table.
+HOT_ROUTES = (
+    ('user.service_list', '/user/services', {'supplier_services'}),
+    ('user.service_list (search)', '/user/services?q={term}', set()),
+    ('user.service_search', '/user/services/search?q={term}', set()),
+    ('user.service_details', '/user/services/{service_id}', set()),
+    ('user.my_requests', '/user/my_requests?email={email}', set()),
+    ('supplier.dashboard', '/supplier/dashboard', {'supplier_services'}),
+    ('supplier.view_requests', '/supplier/service_requests/{service_id}', set()),
+    ('user.product_list', '/user/products', {'products'}),
+    ('user.product_list (filtered)', '/user/products?supplier_id={supplier_id}&in_stock=true&min_price=10', set()),
+    ('user.product_list (accreditation)', '/user/products?accreditation={accreditation}', set()),
+    ('supplier.export_requests', '/supplier/export/requests?service_id={service_id}&since=2000-01-01', set()),
+)
+
+
+# Collect every statement the engine runs inside the block
+@contextmanager
+def capture_statements(engine):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+
+# Tables read by a full scan according to EXPLAIN
+def full_scans(connection, statement, parameters):
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        return _sqlite_full_scans(connection, statement, parameters)
+    if dialect == 'postgresql':
+        return _postgres_full_scans(connection, statement, parameters)
+    raise click.ClickException(f'No query plan check for dialect {dialect}')
+
+
+def _sqlite_full_scans(connection, statement, parameters):
+    rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).all()
+    scans = set()
+    for row in rows:
+        detail = row[-1]
+        # "SCAN t" is a full table scan; "SCAN t USING [COVERING] INDEX" and
+        # virtual-table (FTS5) scans are not
+        if detail.startswith('SCAN ') and ' USING ' not in detail and 'VIRTUAL TABLE' not in detail:
+            scans.add(detail.split()[1])
+    return scans
+
+
+# With sequential scans disabled Postgres only picks one when no index can
+# serve the query, so tiny test tables don't hide a missing index
+def _postgres_full_scans(connection, statement, parameters):
+    with connection.begin_nested():
+        connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+        plan = connection.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {statement}', parameters).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    scans = set()
+    nodes = [plan[0]['Plan']]
+    while nodes:
+        node = nodes.pop()
+        if node.get('Node Type') == 'Seq Scan':
+            scans.add(node['Relation Name'])
+        nodes.extend(node.get('Plans', []))
+    return scans
+
+
+# Ids and terms that make each hot route run its real queries
+def _route_arguments():
+    service_id = db.session.scalar(select(func.min(ServiceRequest.service_id)))
+    service_id = service_id or db.session.scalar(select(func.min(SupplierService.service_id))) or 1
+    email = db.session.scalar(select(ServiceRequest.email).limit(1)) or 'plan-check@example.com'
+    name = db.session.scalar(select(SupplierService.service_name).limit(1)) or 'sequencing'
+    term = name.split()[0]
+    supplier_id = db.session.scalar(select(func.min(Product.supplier_id))) or 1
+    accreditation = db.session.scalar(select(Product.accreditation).where(Product.accreditation.is_not(None)).limit(1)) or 'ISO 17025'
+    return {
+        "service_id": service_id,
+        "email": email,
+        "term": term,
+        "supplier_id": supplier_id,
+        "accreditation": quote(accreditation),
+    }
+
+
+# Run every hot route and EXPLAIN each statement it issued.
+# Returns (endpoint, statement, unexpected full scans) for each regression.
+def check_routes():
+    arguments = _route_arguments()
+    db.session.remove()
+    client = current_app.test_client()
+    engine = db.engine
+    regressions = []
+
+    for endpoint, url, allowed in HOT_ROUTES:
+        # Cache hits would skip the queries under test
+        catalog_cache.bump()
+        with capture_statements(engine) as statements:
+            client.get(url.format(**arguments), buffered=True)
+
+        with engine.connect() as connection:
+            for statement, parameters in statements:
+                if not statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+                    continue
+                scans = full_scans(connection, statement, parameters)
+                known_tables = scans & set(db.metadata.tables)
+                unexpected = known_tables - allowed
+                if unexpected:
+                    regressions.append((endpoint, statement, sorted(unexpected)))
+    return regressions
+
+
+plans_cli = AppGroup('plans', help='Check query plans of hot routes.')
+
+
+# Exits non-zero when a hot route's query falls back to a full table scan
+@plans_cli.command('check')
+def check_command():
+    regressions = check_routes()
+    if not regressions:
+        click.echo(f'All {len(HOT_ROUTES)} hot routes use indexes.')
+        return
+
+    for endpoint, statement, tables in regressions:
+        click.echo(f'{endpoint}: full scan of {", ".join(tables)}', err=True)
+        click.echo(f'    {" ".join(statement.split())}', err=True)
+    raise SystemExit(1)
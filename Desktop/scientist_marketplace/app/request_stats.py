@@ -0,0 +1,135 @@
+import click
+from flask.cli import AppGroup
+from sqlalchemy import and_, case, delete, func, insert, select
+
+from app.counters import increment
+from app.extensions import db
+from app.models import ServiceRequest, ServiceRequestStats, ServiceResponse
+
+STATUSES = ('pending', 'responded', 'rejected')
+
+# Response details recorded when a supplier rejects a request
+REJECTED_DETAILS = 'Rejected'
+
+
+def response_status(response_details, price):
+    return 'rejected' if response_details == REJECTED_DETAILS and price is None else 'responded'
+
+
+# A request's status follows its latest response; pending while it has none
+def request_status(request_id):
+    latest = db.session.execute(
+        select(ServiceResponse.response_details, ServiceResponse.price)
+        .where(ServiceResponse.request_id == request_id)
+        .order_by(ServiceResponse.response_id.desc())
+        .limit(1)
+    ).first()
+    return 'pending' if latest is None else response_status(*latest)
+
+
+# Add deltas such as pending=-1, responded=1 to one service's counters in the
+# caller's transaction
+def adjust_counts(service_id, **deltas):
+    if not any(deltas.values()):
+        return
+    row = {"service_id": service_id, **{status: deltas.get(status, 0) for status in STATUSES}}
+    increment(db.session, ServiceRequestStats.__table__, ('service_id',), [row])
+
+
+def record_request(service_id):
+    adjust_counts(service_id, pending=1)
+
+
+# Call before adding the response, while the request's previous status can
+# still be read. The request row is locked first, so concurrent responses to
+# one request take turns: each sees the status the previous one left, and the
+# counters move once per real transition. (FOR UPDATE compiles away on SQLite,
+# whose single writer makes the slower transaction fail instead.)
+def record_response(service_request, response_details, price):
+    db.session.execute(
+        select(ServiceRequest.request_id)
+        .where(ServiceRequest.request_id == service_request.request_id)
+        .with_for_update()
+    )
+    old = request_status(service_request.request_id)
+    new = response_status(response_details, price)
+    if old != new:
+        adjust_counts(service_request.service_id, **{old: -1, new: 1})
+
+
+# Changes whenever any counter can have moved: requests and responses are only
+# ever added, and deleting a service's requests changes the catalog stamp.
+# Two index lookups, cheap enough to check before reading any counts.
+def counts_version():
+    return tuple(db.session.execute(
+        select(select(func.max(ServiceRequest.request_id)).scalar_subquery(),
+               select(func.max(ServiceResponse.response_id)).scalar_subquery())
+    ).one())
+
+
+def delete_counts(service_ids):
+    db.session.execute(delete(ServiceRequestStats).where(ServiceRequestStats.service_id.in_(service_ids)))
+
+
+# (pending, responded, rejected) per service, with one primary key read
+def request_counts(service_ids):
+    if not service_ids:
+        return {}
+    rows = db.session.execute(
+        select(ServiceRequestStats.service_id, *(ServiceRequestStats.__table__.c[status] for status in STATUSES))
+        .where(ServiceRequestStats.service_id.in_(service_ids))
+    )
+    return {service_id: tuple(counts) for service_id, *counts in rows}
+
+
+# Counters recomputed from service_requests and each request's latest response
+def computed_counts():
+    latest_response_id = (
+        select(func.max(ServiceResponse.response_id))
+        .where(ServiceResponse.request_id == ServiceRequest.request_id)
+        .correlate(ServiceRequest)
+        .scalar_subquery()
+    )
+    rejected = and_(ServiceResponse.response_details == REJECTED_DETAILS, ServiceResponse.price.is_(None))
+    status = case(
+        (ServiceResponse.response_id.is_(None), 'pending'),
+        (rejected, 'rejected'),
+        else_='responded'
+    )
+    rows = db.session.execute(
+        select(ServiceRequest.service_id, *(func.sum(case((status == name, 1), else_=0)) for name in STATUSES))
+        .outerjoin(ServiceResponse, ServiceResponse.response_id == latest_response_id)
+        .group_by(ServiceRequest.service_id)
+    )
+    return {service_id: tuple(counts) for service_id, *counts in rows}
+
+
+# Replace every counter with freshly computed values in one transaction and
+# return how many services had drifted
+def rebuild_request_stats(batch_size=5000):
+    expected = computed_counts()
+    stored = {
+        service_id: tuple(counts)
+        for service_id, *counts in db.session.execute(
+            select(ServiceRequestStats.service_id, *(ServiceRequestStats.__table__.c[status] for status in STATUSES))
+        )
+    }
+    drifted = sum(1 for service_id in expected.keys() | stored.keys() if expected.get(service_id) != stored.get(service_id))
+
+    table = ServiceRequestStats.__table__
+    db.session.execute(delete(table))
+    rows = [{"service_id": service_id, **dict(zip(STATUSES, counts))} for service_id, counts in expected.items()]
+    for start in range(0, len(rows), batch_size):
+        db.session.execute(insert(table), rows[start:start + batch_size])
+    db.session.commit()
+    return {"services": len(rows), "drifted": drifted}
+
+
+stats_cli = AppGroup('stats', help='Maintain precomputed request statistics.')
+
+
+# Rebuild service_request_stats from the requests and responses tables
+@stats_cli.command('reconcile')
+def reconcile_command():
+    report = rebuild_request_stats()
+    click.echo(f'Rebuilt request counts for {report["services"]} services ({report["drifted"]} had drifted).')
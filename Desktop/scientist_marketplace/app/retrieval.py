@@ -0,0 +1,126 @@
+import threading
+from collections import Counter
+
+import numpy as np
+from scipy import sparse
+
+from app.catalog import catalog_cache, get_service_snapshots
+from app.search import tokenize
+
+# Terms too common to help rank scientific services
+STOPWORDS = frozenset((
+    'a', 'an', 'and', 'any', 'are', 'as', 'at', 'be', 'by', 'can', 'do', 'for',
+    'from', 'have', 'i', 'in', 'is', 'it', 'me', 'my', 'need', 'of', 'on', 'or',
+    'our', 'some', 'that', 'the', 'this', 'to', 'we', 'what', 'which', 'who',
+    'with', 'you',
+))
+
+# Term-frequency multipliers per field, a simple BM25F-style weighting
+FIELD_WEIGHTS = (
+    ('service_name', 3),
+    ('accreditation', 2),
+    ('service_description', 1),
+)
+
+
+def query_terms(text):
+    return [token for token in tokenize(text or '') if token not in STOPWORDS]
+
+
+# Immutable scoring state; queries read one of these while a refresh builds the next
+class _Index:
+    def __init__(self, version, vocab, matrix, ids, snapshots):
+        self.version = version
+        self.vocab = vocab
+        self.matrix = matrix
+        self.ids = ids
+        self.snapshots = snapshots
+
+
+# Vectorized BM25 index over the service catalog. Each refresh only
+# re-tokenizes services whose text changed since the last catalog version;
+# the sparse matrix itself is reassembled from cached per-document arrays.
+class ServiceRetriever:
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._index = _Index(None, {}, None, np.empty(0, dtype=np.int64), {})
+        self._docs = {}
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        return self._index.version
+
+    def refresh(self, snapshots, version):
+        with self._lock:
+            if self._index.version == version:
+                return
+            vocab = dict(self._index.vocab)
+            docs = {}
+            for snapshot in snapshots:
+                fingerprint = (snapshot.service_name, snapshot.service_description, snapshot.accreditation)
+                cached = self._docs.get(snapshot.service_id)
+                if cached is None or cached[0] != fingerprint:
+                    cached = (fingerprint, *self._vectorize(snapshot, vocab))
+                docs[snapshot.service_id] = cached
+            self._docs = docs
+            self._index = self._build(version, vocab, snapshots)
+
+    # Column indices and weighted term counts for one service
+    def _vectorize(self, snapshot, vocab):
+        counts = Counter()
+        for field, weight in FIELD_WEIGHTS:
+            for term in query_terms(getattr(snapshot, field)):
+                counts[term] += weight
+        columns = np.fromiter((vocab.setdefault(term, len(vocab)) for term in counts), dtype=np.int64, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        return columns, values
+
+    def _build(self, version, vocab, snapshots):
+        ids = np.fromiter((snapshot.service_id for snapshot in snapshots), dtype=np.int64, count=len(snapshots))
+        by_id = {snapshot.service_id: snapshot for snapshot in snapshots}
+        if not len(ids):
+            return _Index(version, vocab, None, ids, by_id)
+
+        entries = [self._docs[service_id] for service_id in ids.tolist()]
+        lengths = np.fromiter((len(entry[1]) for entry in entries), dtype=np.int64, count=len(entries))
+        columns = np.concatenate([entry[1] for entry in entries])
+        tf = np.concatenate([entry[2] for entry in entries])
+        rows = np.repeat(np.arange(len(entries)), lengths)
+
+        # BM25 weight for every (document, term) pair, computed in one pass
+        doc_len = np.bincount(rows, weights=tf, minlength=len(entries))
+        avg_len = doc_len.mean() or 1.0
+        df = np.bincount(columns, minlength=len(vocab))
+        idf = np.log1p((len(entries) - df + 0.5) / (df + 0.5))
+        norm = self.k1 * (1 - self.b + self.b * doc_len[rows] / avg_len)
+        weights = idf[columns] * tf * (self.k1 + 1) / (tf + norm)
+
+        matrix = sparse.csc_matrix((weights, (rows, columns)), shape=(len(entries), len(vocab)))
+        return _Index(version, vocab, matrix, ids, by_id)
+
+    # Best k (snapshot, score) pairs for a query, highest score first
+    def top_k(self, query, k):
+        index = self._index
+        columns = sorted({index.vocab[term] for term in query_terms(query) if term in index.vocab})
+        if index.matrix is None or not columns:
+            return []
+
+        scores = np.asarray(index.matrix[:, columns].sum(axis=1)).ravel()
+        matched = np.flatnonzero(scores)
+        if len(matched) > k:
+            matched = matched[np.argpartition(scores[matched], -k)[-k:]]
+        best = matched[np.argsort(-scores[matched], kind='stable')]
+        return [(index.snapshots[int(index.ids[row])], float(scores[row])) for row in best]
+
+
+service_retriever = ServiceRetriever()
+
+
+# Shortlist of services for a query against the current catalog version
+def shortlist(query, k):
+    version = catalog_cache.version
+    if service_retriever.version != version:
+        service_retriever.refresh(get_service_snapshots(), version)
+    return [snapshot for snapshot, _ in service_retriever.top_k(query, k)]
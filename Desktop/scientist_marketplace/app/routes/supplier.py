@@ -1,15 +1,46 @@
-from flask import Blueprint, request, render_template, redirect, url_for, flash
+import csv
+import time
+from flask import Blueprint, Response, abort, request, render_template, redirect, url_for, flash, jsonify, stream_with_context
+from sqlalchemy import delete, select
 from app.extensions import db
 from app.models import SupplierService, ServiceRequest, ServiceResponse
+from app.catalog import catalog_cache, get_catalog_stamp, mark_catalog_changed
+from app.catalog_io import IMPORT_KINDS, detect_format, import_catalog
+from app.db_routing import read_replica
+from app.exports import EXPORT_FORMATS, parse_bound, request_export_query, stream_request_export
+from app.fragments import fragment_cache
+from app.http_cache import cacheable, make_etag, not_modified
+from app.jobs import enqueue
+from app.pagination import keyset_paginate
+from app.request_stats import REJECTED_DETAILS, counts_version, delete_counts, record_response, request_counts
 
 # Define the supplier blueprint
 supplier_bp = Blueprint("supplier", __name__)
 
+# Service ids per DELETE ... WHERE ... IN statement, kept well under driver parameter limits
+DELETE_BATCH_SIZE = 500
+
 # Supplier dashboard to view all services
 @supplier_bp.route('/dashboard')
+@read_replica
 def dashboard():
-    services = SupplierService.query.all()
-    return render_template('supplier/dashboard.html', services=services)
+    cursor = request.args.get('cursor')
+    # Request counts change without touching the catalog, so their version is
+    # part of the ETag; the page and the counts are only read on a mismatch
+    etag = make_etag('dashboard', get_catalog_stamp(), cursor, counts_version())
+    unchanged = not_modified(etag)
+    if unchanged is not None:
+        return unchanged
+
+    services = catalog_cache.get(('dashboard', cursor), lambda: _dashboard_page(cursor))
+    counts = request_counts([service.service_id for service in services])
+    return cacheable(render_template('supplier/dashboard.html', services=services, counts=counts), etag)
+
+def _dashboard_page(cursor):
+    stmt = select(
+        SupplierService.service_id, SupplierService.service_name, SupplierService.accreditation, SupplierService.updated_at
+    )
+    return keyset_paginate(stmt, SupplierService.service_id, cursor=cursor)
 
 # Add a new service
 @supplier_bp.route('/add', methods=['GET', 'POST'])
@@ -29,6 +60,7 @@ def add_service():
             supplier_id=supplier_id
         )
         db.session.add(new_service)
+        mark_catalog_changed()
         db.session.commit()
         flash('Service added successfully!', 'success')
         return redirect(url_for('supplier.dashboard'))
@@ -44,7 +76,9 @@ def service_details(service_id):
         service.service_name = request.form['service_name']
         service.service_description = request.form.get('service_description', '')
         service.accreditation = request.form.get('accreditation', '')
+        mark_catalog_changed()
         db.session.commit()
+        fragment_cache.invalidate(service_id)
         flash('Service details updated successfully!', 'success')
         return redirect(url_for('supplier.dashboard'))
 
@@ -59,7 +93,9 @@ def edit_service(service_id):
         service.service_name = request.form['service_name']
         service.service_description = request.form.get('service_description', '')
         service.accreditation = request.form.get('accreditation', '')
+        mark_catalog_changed()
         db.session.commit()
+        fragment_cache.invalidate(service_id)
         flash('Service updated successfully!', 'success')
         return redirect(url_for('supplier.dashboard'))
 
@@ -68,27 +104,133 @@ def edit_service(service_id):
 # Delete a service along with related requests and responses
 @supplier_bp.route('/delete/<int:service_id>', methods=['POST'])
 def delete_service(service_id):
-    service = SupplierService.query.get_or_404(service_id)
-
-    associated_requests = ServiceRequest.query.filter_by(service_id=service_id).all()
-
-    for req in associated_requests:
-        associated_responses = ServiceResponse.query.filter_by(request_id=req.request_id).all()
-        for resp in associated_responses:
-            db.session.delete(resp)
-        db.session.delete(req)
+    deleted = _delete_services([service_id])
+    if not deleted["services"]:
+        db.session.rollback()
+        abort(404)
 
-    db.session.delete(service)
     db.session.commit()
+    fragment_cache.invalidate(service_id)
     flash('Service and related requests/responses deleted successfully!', 'success')
     return redirect(url_for('supplier.dashboard'))
 
+# Delete many services and their requests/responses in one transaction
+@supplier_bp.route('/delete_bulk', methods=['POST'])
+def delete_services_bulk():
+    payload = request.get_json(silent=True)
+    if payload is None:
+        raw_ids = request.form.getlist('service_ids')
+    elif not isinstance(payload, dict):
+        return jsonify({"error": "Expected a JSON object with a service_ids list"}), 400
+    else:
+        raw_ids = payload.get('service_ids', [])
+        if not isinstance(raw_ids, list):
+            return jsonify({"error": "service_ids must be a list of integers"}), 400
+    try:
+        if any(isinstance(service_id, (bool, float)) for service_id in raw_ids):
+            raise ValueError
+        service_ids = sorted({int(service_id) for service_id in raw_ids})
+    except (TypeError, ValueError):
+        return jsonify({"error": "service_ids must be integers"}), 400
+    if not service_ids:
+        return jsonify({"error": "No service_ids provided"}), 400
+
+    started = time.perf_counter()
+    deleted = _delete_services(service_ids)
+    db.session.commit()
+    fragment_cache.invalidate(*service_ids)
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    if payload is None:
+        flash(f'Deleted {deleted["services"]} services, {deleted["requests"]} requests and {deleted["responses"]} responses.', 'success')
+        return redirect(url_for('supplier.dashboard'))
+    return jsonify({"deleted": deleted, "elapsed_ms": elapsed_ms})
+
+# Set-based delete: one statement per table per batch instead of a query and
+# a DELETE per row. Bookings and their payments go through ON DELETE CASCADE.
+def _delete_services(service_ids):
+    deleted = {"services": 0, "requests": 0, "responses": 0}
+    for start in range(0, len(service_ids), DELETE_BATCH_SIZE):
+        batch = service_ids[start:start + DELETE_BATCH_SIZE]
+        request_ids = select(ServiceRequest.request_id).where(ServiceRequest.service_id.in_(batch))
+        statements = (
+            ("responses", delete(ServiceResponse).where(ServiceResponse.request_id.in_(request_ids))),
+            ("requests", delete(ServiceRequest).where(ServiceRequest.service_id.in_(batch))),
+            ("services", delete(SupplierService).where(SupplierService.service_id.in_(batch))),
+        )
+        for name, statement in statements:
+            result = db.session.execute(statement, execution_options={"synchronize_session": False})
+            deleted[name] += result.rowcount
+        delete_counts(batch)
+
+    mark_catalog_changed()
+    return deleted
+
+# Upload a CSV or JSONL (optionally gzipped) catalog of services or products.
+# The file is streamed into batched inserts rather than read into memory.
+@supplier_bp.route('/import', methods=['POST'])
+def import_catalog_upload():
+    upload = request.files.get('file')
+    kind = request.form.get('kind', 'services')
+    if upload is None or not upload.filename:
+        return jsonify({"error": "No file uploaded"}), 400
+    if kind not in IMPORT_KINDS:
+        return jsonify({"error": f"kind must be one of {', '.join(IMPORT_KINDS)}"}), 400
+    fmt = request.form.get('format') or detect_format(upload.filename)
+    if fmt is None:
+        return jsonify({"error": "Cannot detect the file format; pass format=csv or format=jsonl"}), 400
+
+    # Placeholder for logged-in supplier
+    supplier_id = 1
+
+    try:
+        report = import_catalog(upload.stream, kind, fmt, default_supplier_id=supplier_id)
+    except (UnicodeDecodeError, csv.Error) as e:
+        return jsonify({"error": f"Could not read the file: {e}"}), 400
+
+    if request.accept_mimetypes.best_match(['application/json', 'text/html']) == 'text/html':
+        flash(f'Imported {report["imported"]} of {report["rows"]} {kind} ({report["skipped"]} skipped).', 'success')
+        return redirect(url_for('supplier.dashboard'))
+    return jsonify(report)
+
 # View service requests for a specific service
 @supplier_bp.route('/service_requests/<int:service_id>')
+@read_replica
 def view_requests(service_id):
-    requests = ServiceRequest.query.filter_by(service_id=service_id).all()
+    stmt = (
+        select(ServiceRequest.request_id, ServiceRequest.user_name, ServiceRequest.research_description)
+        .where(ServiceRequest.service_id == service_id)
+    )
+    requests = keyset_paginate(stmt, ServiceRequest.request_id, cursor=request.args.get('cursor'))
     return render_template('supplier/view_requests.html', requests=requests, service_id=service_id)
 
+# Stream requests and their responses as CSV or JSONL, optionally gzipped,
+# filtered by service and by request date (since inclusive, until exclusive)
+@supplier_bp.route('/export/requests')
+def export_requests():
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"error": f"format must be one of {', '.join(EXPORT_FORMATS)}"}), 400
+    compress = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+    # A malformed service_id must not fall back to exporting every service
+    raw_service_id = request.args.get('service_id')
+    try:
+        service_id = int(raw_service_id) if raw_service_id is not None else None
+        since = parse_bound(request.args.get('since'))
+        until = parse_bound(request.args.get('until'), end=True)
+    except ValueError:
+        return jsonify({"error": "service_id must be an integer; since and until must be ISO dates or datetimes"}), 400
+
+    stmt = request_export_query(service_id=service_id, since=since, until=until)
+    filename = f'service_requests{f"_{service_id}" if service_id else ""}.{fmt}'
+    if compress:
+        filename += '.gz'
+    return Response(
+        stream_with_context(stream_request_export(stmt, fmt, compress=compress)),
+        mimetype='application/gzip' if compress else EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
 # Respond to a service request with an option to reject
 @supplier_bp.route('/respond/<int:request_id>', methods=['GET', 'POST'])
 def respond_request(request_id):
@@ -96,13 +238,15 @@ def respond_request(request_id):
 
     if request.method == 'POST':
         if 'reject' in request.form:
+            record_response(service_request, REJECTED_DETAILS, None)
             new_response = ServiceResponse(
                 request_id=request_id,
                 supplier_id=1,  
-                response_details="Rejected",
+                response_details=REJECTED_DETAILS,
                 price=None
             )
             db.session.add(new_response)
+            enqueue('notify_requester', request_id=request_id)
             db.session.commit()
             flash('Request rejected successfully!', 'warning')
             return redirect(url_for('supplier.dashboard'))
@@ -110,6 +254,7 @@ def respond_request(request_id):
         response_details = request.form['response_details']
         price = float(request.form.get('price', 0))
 
+        record_response(service_request, response_details, price)
         new_response = ServiceResponse(
             request_id=request_id,
             supplier_id=1,  
@@ -117,6 +262,7 @@ def respond_request(request_id):
             price=price
         )
         db.session.add(new_response)
+        enqueue('notify_requester', request_id=request_id)
         db.session.commit()
         flash('Response sent successfully!', 'success')
         return redirect(url_for('supplier.dashboard'))
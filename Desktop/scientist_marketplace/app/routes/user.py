@@ -1,134 +1,309 @@
-from flask import Blueprint, request, render_template, redirect, url_for, flash, jsonify
+import json
+import time
+from flask import Blueprint, Response, abort, current_app, request, render_template, redirect, session, url_for, flash, jsonify, stream_with_context
+from sqlalchemy import func, select
 from app.extensions import db
-from app.models import SupplierService, ServiceRequest, ServiceResponse
-from groq import Groq
-import os
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
-
-# Initialize Groq client
-api_key = os.environ.get("GROQ_API_KEY")
-if not api_key:
-    raise ValueError("GROQ_API_KEY not found in environment variables.")
-client = Groq(api_key=api_key)
+from app.models import ChatLog, Product, SupplierService, ServiceRequest, ServiceResponse
+from app.assistant import StreamingMatcher, answer_cache, build_messages, parse_answer, service_to_dict
+from app.catalog import catalog_cache, get_catalog_stamp
+from app.chat_log import chat_log, history_id
+from app.db_routing import read_replica
+from app.http_cache import cacheable, make_etag, not_modified
+from app.instrumentation import timed
+from app.jobs import enqueue
+from app.retrieval import shortlist
+from app.llm import LLMCircuitOpen, LLMTimeout, LLMUnavailable, get_llm_backend, get_llm_executor, token_usage
+from app.pagination import Page, keyset_paginate
+from app.products import browse_query, facet_counts, product_to_dict
+from app.request_stats import record_request
+from app.search import search_services
 
 # Define the user blueprint
 user_bp = Blueprint("user", __name__)
 
+# Characters of the description shown on list pages
+DESCRIPTION_SNIPPET_LENGTH = 200
+
+# Shortlisted services returned when the AI assistant is unavailable
+LOCAL_FALLBACK_RESULTS = 5
+
 # User service list with search functionality
 @user_bp.route('/services', methods=['GET'])
+@read_replica
 def service_list():
     query = request.args.get('q', '')
+    cursor = request.args.get('cursor')
+
+    # Deletes don't advance max(updated_at), so the page has an ETag but no Last-Modified
+    etag = make_etag('service_list', get_catalog_stamp(), query, cursor)
+    unchanged = not_modified(etag)
+    if unchanged is not None:
+        return unchanged
 
     if query:
-        services = SupplierService.query.filter(
-            (SupplierService.service_name.ilike(f"%{query}%")) |
-            (SupplierService.service_description.ilike(f"%{query}%")) |
-            (SupplierService.accreditation.ilike(f"%{query}%"))
-        ).all()
+        services = Page([service for service, _ in search_services(query)])
     else:
-        services = SupplierService.query.all()
+        services = catalog_cache.get(('service_list', cursor), lambda: _service_list_page(cursor))
 
-    return render_template('user/service_list.html', services=services, query=query)
+    return cacheable(render_template('user/service_list.html', services=services, query=query), etag)
 
-# Enhanced AI-powered service recommendation and research assistant
-@user_bp.route('/ai_search', methods=['POST'])
-def ai_search():
-    user_input = request.json.get('query')
-    if not user_input:
-        return jsonify({"error": "No query provided"}), 400
+# Only the columns the list shows, with a snippet of the description
+def _service_list_page(cursor):
+    stmt = select(
+        SupplierService.service_id,
+        SupplierService.service_name,
+        func.substr(SupplierService.service_description, 1, DESCRIPTION_SNIPPET_LENGTH).label('service_description'),
+        SupplierService.updated_at
+    )
+    return keyset_paginate(stmt, SupplierService.service_id, cursor=cursor)
 
-    try:
-        # Fetch all available services from the database
-        all_services = SupplierService.query.all()
-        service_names = [service.service_name for service in all_services]
-
-        # Create a dynamic prompt for the AI to choose the best matching services or provide research insights
-        service_list_str = "\n".join(service_names)
-        prompt = (
-            f"You are an AI research assistant specializing in scientific research and service recommendations. "
-            f"Here is a list of available services:\n{service_list_str}\n"
-            f"User Query: {user_input}\n"
-            f"Your task:\n"
-            f"1. Provide research insights or solutions if the query requires analytical thinking or problem-solving.\n"
-            f"2. If the query is related to research services, recommend the most relevant services from the list.\n"
-            f"3. Only include services that match the context of the query and exist in the provided list."
-        )
+# JSON variant of the ranked service search
+@user_bp.route('/services/search', methods=['GET'])
+def service_search():
+    query = request.args.get('q', '')
+    if not query:
+        return jsonify({"error": "No query provided"}), 400
 
-        # Groq API chat completion
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": prompt},
-                {"role": "user", "content": user_input}
-            ],
-            model="deepseek-r1-distill-llama-70b",
-            temperature=0.5,
-            max_completion_tokens=1024,
-            top_p=1,
-            stream=False
-        )
+    limit = request.args.get('limit', type=int)
+    results = search_services(query, limit=limit)
 
-        # Extract the AI response
-        ai_response = chat_completion.choices[0].message.content.strip()
-        print(f"AI Response: {ai_response}")
-
-        # Extract recommended services and research insights from the AI response
-        recommended_services = []
-        unmatched_services = []
-        research_insights = []
-
-        for line in ai_response.splitlines():
-            line = line.strip("-•1234567890. ").lower()
-            matched = False
-            for service_name in service_names:
-                if service_name.lower() in line:
-                    matching_services = [
-                        service for service in all_services if service.service_name.lower() == service_name.lower()
-                    ]
-                    recommended_services.extend(matching_services)
-                    matched = True
-                    break
-            if not matched:
-                research_insights.append(line)
-
-        # Deduplicate the list by service ID
-        recommended_services = list({service.service_id: service for service in recommended_services}.values())
-
-        # Format response for matched and unmatched services
-        response_data = [
+    return jsonify({
+        "query": query,
+        "services": [
             {
                 "id": service.service_id,
                 "name": service.service_name,
                 "description": service.service_description,
-                "accreditation": service.accreditation
+                "accreditation": service.accreditation,
+                "score": rank
             }
-            for service in recommended_services
+            for service, rank in results
         ]
+    })
 
-        response_message = {
-            "response": ai_response,
-            "research_insights": "\n".join(research_insights),
-            "services": response_data
-        }
+# Enhanced AI-powered service recommendation and research assistant
+@user_bp.route('/ai_search', methods=['POST'])
+def ai_search():
+    user_input = request.json.get('query')
+    if not user_input:
+        return jsonify({"error": "No query provided"}), 400
 
-        if unmatched_services:
-            response_message["unmatched"] = f"Some recommended services were not found in the database: {', '.join(unmatched_services)}"
+    started = time.perf_counter()
+    client_id = history_id()
+    # Token counts of the upstream call, when this request made one
+    usage = {}
+    try:
+        # Shortlist the services most relevant to the query instead of sending the whole catalog
+        with timed('retrieval'):
+            candidates = shortlist(user_input, current_app.config['AI_SEARCH_TOP_K'])
 
-        if not response_data and not research_insights:
-            return jsonify({"message": "No relevant research insights or matching services found."}), 200
+        # Repeated questions are answered from the cache; concurrent identical
+        # questions share one upstream call
+        try:
+            response_message = answer_cache.get_or_compute(user_input, lambda: _ai_answer(user_input, candidates, usage))
+        except (LLMCircuitOpen, LLMTimeout):
+            response_message = _local_recommendations(candidates)
+        except LLMUnavailable as e:
+            return _llm_unavailable(e)
 
+        _log_turn(client_id, user_input, response_message, (time.perf_counter() - started) * 1000, **usage)
         return jsonify(response_message)
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# Ask the LLM and turn its answer into the ai_search response body
+def _ai_answer(user_input, candidates, usage):
+    messages = build_messages(user_input, candidates)
+    # Chat completion from the configured LLM backend, run on the bounded LLM pool
+    with timed('llm'):
+        ai_response = get_llm_executor().complete(get_llm_backend(), messages)
+    usage["prompt_tokens"], usage["completion_tokens"] = token_usage(messages, ai_response)
+    return _answer_body(ai_response)
+
+# Queue the question and its answer for the visitor's chat history
+def _log_turn(client_id, question, answer, latency_ms, prompt_tokens=None, completion_tokens=None):
+    chat_log.record('user', question, client_id=client_id)
+    chat_log.record(
+        'assistant',
+        answer.get("response") or answer.get("research_insights") or answer.get("message", ""),
+        client_id=client_id,
+        latency_ms=round(latency_ms, 1),
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens
+    )
+
+def _answer_body(ai_response):
+    # Extract recommended services and research insights from the AI response
+    research_insights, recommended_services = parse_answer(ai_response)
+
+    # Format response for matched and unmatched services
+    response_data = [service_to_dict(service) for service in recommended_services]
+
+    if not response_data and not research_insights:
+        return {"message": "No relevant research insights or matching services found."}
+
+    return {
+        "response": ai_response,
+        "research_insights": research_insights,
+        "services": response_data
+    }
+
+# Streaming variant of ai_search: forwards model tokens as Server-Sent Events and
+# emits each recommended service as soon as it is recognized
+@user_bp.route('/ai_search/stream', methods=['GET', 'POST'])
+def ai_search_stream():
+    payload = request.get_json(silent=True) or {}
+    user_input = payload.get('query') or request.args.get('q')
+    if not user_input:
+        return jsonify({"error": "No query provided"}), 400
+
+    started = time.perf_counter()
+    # Read before streaming starts; the session can't change once headers are sent
+    client_id = history_id()
+    candidates = shortlist(user_input, current_app.config['AI_SEARCH_TOP_K'])
+    messages = build_messages(user_input, candidates)
+
+    # A cached answer is replayed as-is; otherwise fall back to local results
+    # when the provider's circuit is open
+    chunks = None
+    answer = answer_cache.get(user_input)
+    if answer is None:
+        try:
+            chunks = get_llm_executor().stream(get_llm_backend(), messages)
+        except LLMCircuitOpen:
+            answer = _local_recommendations(candidates)
+        except LLMUnavailable as e:
+            return _llm_unavailable(e)
+
+    def generate():
+        yield _sse('start', {"candidates": len(candidates)})
+        if chunks is None:
+            for service in answer.get("services", []):
+                yield _sse('service', service)
+            yield _sse('done', answer)
+            _log_turn(client_id, user_input, answer, (time.perf_counter() - started) * 1000)
+            return
+
+        matcher = StreamingMatcher()
+        first_token_ms = None
+        try:
+            for chunk in chunks:
+                if first_token_ms is None:
+                    first_token_ms = (time.perf_counter() - started) * 1000
+                yield _sse('token', {"text": chunk})
+                for service in matcher.feed(chunk):
+                    yield _sse('service', service_to_dict(service))
+        except Exception as e:
+            yield _sse('error', {"error": str(e)})
+            return
+
+        body = _answer_body(matcher.text.strip())
+        answer_cache.set(user_input, body)
+        total_ms = (time.perf_counter() - started) * 1000
+        current_app.logger.info("ai_search stream: first token %.0f ms, total %.0f ms", first_token_ms or -1, total_ms)
+        yield _sse('done', dict(body, timings={"first_token_ms": first_token_ms, "total_ms": total_ms}))
+        _log_turn(client_id, user_input, body, total_ms, *token_usage(messages, matcher.text))
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers=headers)
+
+# Product browsing with filters on price range, stock, accreditation and
+# supplier. Facet counts are catalog-wide, read from the precomputed index.
+@user_bp.route('/products', methods=['GET'])
+@read_replica
+def product_list():
+    try:
+        filters = _product_filters(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    page = keyset_paginate(browse_query(**filters), Product.product_id, cursor=request.args.get('cursor'))
+    return jsonify({
+        "products": [product_to_dict(row.Product) for row in page],
+        "facets": facet_counts(current_app.config['PRODUCT_FACET_LIMIT']),
+        "next_cursor": page.next_cursor,
+        "prev_cursor": page.prev_cursor
+    })
+
+def _product_filters(args):
+    filters = {}
+    for name in ('min_price', 'max_price'):
+        if args.get(name):
+            try:
+                filters[name] = float(args[name])
+            except ValueError:
+                raise ValueError(f'{name} must be a number')
+    if args.get('in_stock'):
+        if args['in_stock'].lower() not in ('true', 'false', '1', '0'):
+            raise ValueError('in_stock must be true or false')
+        filters['in_stock'] = args['in_stock'].lower() in ('true', '1')
+    if args.get('accreditation'):
+        filters['accreditation'] = args['accreditation']
+    if args.get('supplier_id'):
+        try:
+            filters['supplier_id'] = int(args['supplier_id'])
+        except ValueError:
+            raise ValueError('supplier_id must be an integer')
+    return filters
+
+# The visitor's AI assistant history, newest first. Turns are written in
+# batches, so the latest one can take CHAT_LOG_FLUSH_INTERVAL to appear.
+@user_bp.route('/ai_search/history', methods=['GET'])
+def ai_search_history():
+    client_id = history_id(create=False)
+    if client_id is None:
+        return jsonify({"messages": [], "next_cursor": None, "prev_cursor": None})
+
+    stmt = select(
+        ChatLog.chat_id,
+        ChatLog.role,
+        ChatLog.message,
+        ChatLog.latency_ms,
+        ChatLog.prompt_tokens,
+        ChatLog.completion_tokens,
+        ChatLog.created_at
+    ).where(ChatLog.client_id == client_id)
+    page = keyset_paginate(stmt, ChatLog.chat_id, cursor=request.args.get('cursor'), descending=True)
+    return jsonify({
+        "messages": [dict(row._mapping, created_at=row.created_at.isoformat()) for row in page],
+        "next_cursor": page.next_cursor,
+        "prev_cursor": page.prev_cursor
+    })
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+# Degraded answer built from the local retrieval shortlist alone
+def _local_recommendations(candidates):
+    return {
+        "response": "",
+        "research_insights": "The AI assistant is unavailable right now. Here are the closest matches from the catalog.",
+        "services": [service_to_dict(service) for service in candidates[:LOCAL_FALLBACK_RESULTS]],
+        "degraded": True
+    }
+
+def _llm_unavailable(error):
+    response = jsonify({"error": str(error)})
+    response.status_code = error.status_code
+    if error.retry_after:
+        response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
 # User service details page
 @user_bp.route('/services/<int:service_id>', methods=['GET'])
+@read_replica
 def service_details(service_id):
+    updated_at = db.session.scalar(select(SupplierService.updated_at).where(SupplierService.service_id == service_id))
+    if updated_at is None:
+        abort(404)
+    etag = make_etag('service_details', service_id, updated_at)
+    unchanged = not_modified(etag, updated_at)
+    if unchanged is not None:
+        return unchanged
+
     service = SupplierService.query.get_or_404(service_id)
-    return render_template('user/service_details.html', service=service)
+    return cacheable(render_template('user/service_details.html', service=service), etag, service.updated_at)
 
 # Submit a service request
 @user_bp.route('/services/<int:service_id>/request', methods=['GET', 'POST'])
@@ -147,16 +322,44 @@ def submit_request(service_id):
             research_description=research_description
         )
         db.session.add(new_request)
+        record_request(service_id)
+        db.session.flush()
+        enqueue('notify_supplier', request_id=new_request.request_id)
         db.session.commit()
+        session['requester_email'] = email
         flash('Service request submitted successfully!', 'success')
         return redirect(url_for('user.my_requests'))
 
     service = SupplierService.query.get_or_404(service_id)
     return render_template('user/submit_request.html', service=service)
 
-# View user service requests
+# View user service requests, scoped to the email this session submitted
+# requests with. An email in the query string is ignored, so nobody can list
+# someone else's requests by guessing their address.
 @user_bp.route('/my_requests', methods=['GET'])
 def my_requests():
-    service_requests = ServiceRequest.query.all()
-    responses = {resp.request_id: resp for resp in ServiceResponse.query.all()}
-    return render_template('user/my_requests.html', service_requests=service_requests, responses=responses)
+    email = session.get('requester_email')
+    if not email:
+        return render_template('user/my_requests.html', service_requests=Page([]), email=None)
+
+    # Latest response per request, found through the index on service_responses.request_id
+    latest_response_id = (
+        select(func.max(ServiceResponse.response_id))
+        .where(ServiceResponse.request_id == ServiceRequest.request_id)
+        .correlate(ServiceRequest)
+        .scalar_subquery()
+    )
+    stmt = (
+        select(
+            ServiceRequest.request_id,
+            ServiceRequest.research_description,
+            SupplierService.service_name,
+            ServiceResponse.response_details,
+            ServiceResponse.price
+        )
+        .join(SupplierService, SupplierService.service_id == ServiceRequest.service_id)
+        .outerjoin(ServiceResponse, ServiceResponse.response_id == latest_response_id)
+        .where(ServiceRequest.email == email)
+    )
+    service_requests = keyset_paginate(stmt, ServiceRequest.request_id, cursor=request.args.get('cursor'), descending=True)
+    return render_template('user/my_requests.html', service_requests=service_requests, email=email)
@@ -0,0 +1,168 @@
+import re
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import Float, Integer, cast, column, func, literal, select, text
+from sqlalchemy.dialects import postgresql
+
+from app.extensions import db
+from app.models import SupplierService
+
+# Searchable fields with their Postgres weight label and relative importance.
+# A match in the service name outranks one in the accreditation, which in turn
+# outranks a match buried in the description.
+FIELD_WEIGHTS = (
+    ('service_name', 'A', 1.0),
+    ('accreditation', 'B', 0.4),
+    ('service_description', 'C', 0.1),
+)
+
+FTS_TABLE = 'supplier_services_fts'
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+# Split a free-text query into plain word tokens
+def tokenize(query):
+    return _TOKEN_RE.findall(query.lower())
+
+
+# Rank matching services for a query, best match first
+def search_services(query, limit=None):
+    max_limit = current_app.config['SEARCH_RESULT_LIMIT']
+    limit = max(1, min(limit or max_limit, max_limit))
+    tokens = tokenize(query)
+    if not tokens:
+        return []
+
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        stmt = _postgres_statement(query, limit)
+    elif dialect == 'sqlite':
+        stmt = _sqlite_statement(tokens, limit)
+    else:
+        stmt = _fallback_statement(query, limit)
+
+    return [(service, float(rank)) for service, rank in db.session.execute(stmt)]
+
+
+# tsvector column maintained by the database, weighted per FIELD_WEIGHTS
+def _postgres_statement(query, limit):
+    vector = column('search_vector', postgresql.TSVECTOR)
+    tsquery = func.websearch_to_tsquery('english', query)
+
+    # ts_rank takes weights ordered {D, C, B, A}
+    by_label = {label: weight for _, label, weight in FIELD_WEIGHTS}
+    weights = [by_label.get(label, 0.0) for label in 'DCBA']
+    rank = func.ts_rank(cast(literal(weights), postgresql.ARRAY(postgresql.REAL)), vector, tsquery)
+
+    return (
+        select(SupplierService, rank.label('rank'))
+        .where(vector.op('@@')(tsquery))
+        .order_by(rank.desc(), SupplierService.service_id)
+        .limit(limit)
+    )
+
+
+# FTS5 external-content table kept in sync with supplier_services by triggers
+def _sqlite_statement(tokens, limit):
+    # Quote every token so user input can't inject FTS5 syntax, and allow
+    # prefix matches so "sequenc" still finds "sequencing"
+    match = ' '.join(f'"{token}"*' for token in tokens)
+    weights = ', '.join(str(weight * 10) for _, _, weight in _fts_columns())
+
+    fts = (
+        text(
+            f'SELECT rowid, bm25({FTS_TABLE}, {weights}) AS rank FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH :match ORDER BY rank LIMIT :limit'
+        )
+        .bindparams(match=match, limit=limit)
+        .columns(column('rowid', Integer), column('rank', Float))
+        .subquery('fts')
+    )
+
+    # bm25() scores are negative; flip the sign so higher means better everywhere
+    return (
+        select(SupplierService, (-fts.c.rank).label('rank'))
+        .join(fts, fts.c.rowid == SupplierService.service_id)
+        .order_by(fts.c.rank, SupplierService.service_id)
+    )
+
+
+# Unindexed substring match for databases without a full-text index
+def _fallback_statement(query, limit):
+    pattern = f'%{query}%'
+    return (
+        select(SupplierService, literal(0.0).label('rank'))
+        .where(
+            (SupplierService.service_name.ilike(pattern)) |
+            (SupplierService.service_description.ilike(pattern)) |
+            (SupplierService.accreditation.ilike(pattern))
+        )
+        .order_by(SupplierService.service_id)
+        .limit(limit)
+    )
+
+
+# FTS5 column order must match the virtual table definition
+def _fts_columns():
+    order = ('service_name', 'service_description', 'accreditation')
+    by_field = {field: (field, label, weight) for field, label, weight in FIELD_WEIGHTS}
+    return [by_field[field] for field in order]
+
+
+# DDL for the SQLite FTS5 index; mirrored by the add_service_search_index migration
+SQLITE_FTS_DDL = (
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        service_name, service_description, accreditation,
+        content='supplier_services', content_rowid='service_id'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS supplier_services_fts_ai AFTER INSERT ON supplier_services BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, service_name, service_description, accreditation)
+        VALUES (new.service_id, new.service_name, new.service_description, new.accreditation);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS supplier_services_fts_ad AFTER DELETE ON supplier_services BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, service_name, service_description, accreditation)
+        VALUES ('delete', old.service_id, old.service_name, old.service_description, old.accreditation);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS supplier_services_fts_au AFTER UPDATE ON supplier_services BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, service_name, service_description, accreditation)
+        VALUES ('delete', old.service_id, old.service_name, old.service_description, old.accreditation);
+        INSERT INTO {FTS_TABLE}(rowid, service_name, service_description, accreditation)
+        VALUES (new.service_id, new.service_name, new.service_description, new.accreditation);
+    END""",
+)
+
+
+# Keep autogenerate from proposing to drop the database-maintained index objects
+def include_object(object, name, type_, reflected, compare_to):
+    if reflected and compare_to is None:
+        if type_ == 'column' and name == 'search_vector':
+            return False
+        if type_ == 'table' and name.startswith(FTS_TABLE):
+            return False
+    return True
+
+
+search_cli = AppGroup('search', help='Manage the service full-text index.')
+
+
+# Create the index if it is missing and rebuild it from supplier_services
+@search_cli.command('reindex')
+def reindex_command():
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        for statement in SQLITE_FTS_DDL:
+            db.session.execute(text(statement))
+        db.session.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+        db.session.commit()
+        click.echo('SQLite FTS5 index rebuilt.')
+    elif dialect == 'postgresql':
+        # search_vector is a generated column, so Postgres keeps it current;
+        # a REINDEX only compacts the GIN index
+        db.session.execute(text('REINDEX INDEX ix_supplier_services_search_vector'))
+        db.session.commit()
+        click.echo('Postgres search index reindexed.')
+    else:
+        click.echo(f'No full-text index for dialect {dialect}; searches fall back to ILIKE.')
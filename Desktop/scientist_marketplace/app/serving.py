@@ -0,0 +1,64 @@
+import gc
+
+from flask import current_app, jsonify
+from sqlalchemy import text
+
+from app.catalog import catalog_cache, get_catalog_stamp, get_service_snapshots, get_services_by_id
+from app.chat_log import chat_log
+from app.extensions import db
+from app.retrieval import service_retriever
+
+
+# Load the catalog and build the retrieval index in the pre-fork master, so
+# every worker starts warm and shares these structures copy-on-write. The
+# master's connections are closed afterwards; workers open their own.
+def warm_up(app):
+    with app.app_context():
+        snapshots = get_service_snapshots()
+        get_services_by_id()
+        get_catalog_stamp()
+        service_retriever.refresh(snapshots, catalog_cache.version)
+        for engine in db.engines.values():
+            engine.dispose()
+    # Keep the warm objects out of the collector's reach, so collections in
+    # the workers don't touch (and copy) the pages they live on
+    gc.freeze()
+    return len(snapshots)
+
+
+# Pooled connections inherited through fork() belong to the parent; give the
+# worker fresh pools without closing the parent's sockets
+def reset_engines(app):
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+
+def shutdown_worker():
+    chat_log.flush()
+
+
+# Liveness: the process is serving requests. Never touches the database, so a
+# database outage doesn't get every worker restarted.
+def healthz():
+    return jsonify(status='ok')
+
+
+# Readiness: the primary and every replica answer a query
+def readyz():
+    failures = {}
+    for bind, engine in db.engines.items():
+        try:
+            with engine.connect() as connection:
+                connection.execute(text('SELECT 1'))
+        except Exception as error:
+            failures[bind or 'primary'] = type(error).__name__
+            current_app.logger.warning('Readiness check failed for %s: %s', bind or 'primary', error)
+    if failures:
+        return jsonify(status='unavailable', failures=failures), 503
+    return jsonify(status='ok', catalog_version=catalog_cache.version)
+
+
+def init_app(app):
+    app.add_url_rule('/healthz', 'healthz', healthz)
+    app.add_url_rule('/readyz', 'readyz', readyz)
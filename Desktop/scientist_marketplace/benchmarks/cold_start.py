@@ -0,0 +1,59 @@
+"""Cold start of the app factory and of the first LLM call.
+
+Each sample runs in a fresh interpreter, the way a CLI command or a new
+worker process starts, and reports whether the LLM SDK was imported:
+
+    python -m benchmarks.cold_start --runs 5
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# Runs in the child interpreter
+PROBE = '''
+import json, sys, time
+started = time.perf_counter()
+from app import create_app
+app = create_app()
+ready = time.perf_counter()
+result = {"create_app_ms": (ready - started) * 1000, "groq_imported": "groq" in sys.modules}
+if sys.argv[1] == 'build':
+    from app.llm import get_llm_backend
+    with app.app_context():
+        get_llm_backend()
+    result["first_backend_ms"] = (time.perf_counter() - ready) * 1000
+print(json.dumps(result))
+'''
+
+
+def sample(build_backend, env=None):
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE, 'build' if build_backend else 'startup'],
+        capture_output=True, text=True, check=True, env=env,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run(runs):
+    startup = [sample(False) for _ in range(runs)]
+    first_call = [sample(True) for _ in range(runs)]
+    return {
+        "benchmark": "cold_start",
+        "runs": runs,
+        "create_app_ms_p50": round(statistics.median(s["create_app_ms"] for s in startup), 1),
+        "llm_sdk_imported_at_startup": any(s["groq_imported"] for s in startup),
+        "first_backend_ms_p50": round(statistics.median(s["first_backend_ms"] for s in first_call), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.runs), indent=2))
+
+
+if __name__ == '__main__':
+    main()
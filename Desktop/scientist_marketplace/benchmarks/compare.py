@@ -0,0 +1,45 @@
+"""Compare two benchmarks.load result files, e.g. from two commits.
+
+    python -m benchmarks.compare before.json after.json
+"""
+import argparse
+import json
+
+METRICS = ('throughput_rps', 'latency_ms_p50', 'latency_ms_p95', 'latency_ms_p99', 'errors')
+
+
+def _change(before, after):
+    if not before:
+        return 'n/a'
+    return f'{(after - before) / before * 100:+.1f}%'
+
+
+def compare(before, after):
+    rows = []
+    for scenario in sorted(set(before["scenarios"]) & set(after["scenarios"])):
+        for metric in METRICS:
+            old = before["scenarios"][scenario][metric]
+            new = after["scenarios"][scenario][metric]
+            rows.append((scenario, metric, old, new, _change(old, new)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('before')
+    parser.add_argument('after')
+    args = parser.parse_args()
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+
+    print(f'{before.get("commit") or args.before} -> {after.get("commit") or args.after}')
+    print(f'{"scenario":<16}{"metric":<18}{"before":>12}{"after":>12}{"change":>10}')
+    for scenario, metric, old, new, change in compare(before, after):
+        print(f'{scenario:<16}{metric:<18}{old:>12}{new:>12}{change:>10}')
+
+
+if __name__ == '__main__':
+    main()
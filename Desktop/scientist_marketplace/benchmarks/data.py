@@ -0,0 +1,37 @@
+"""Deterministic synthetic catalog data shared by the benchmarks."""
+import random
+
+TERMS = (
+    'pcr', 'qpcr', 'sequencing', 'genome', 'rna', 'dna', 'proteomics', 'mass', 'spectrometry',
+    'nmr', 'crystallography', 'microscopy', 'confocal', 'electron', 'cryo', 'flow', 'cytometry',
+    'elisa', 'western', 'blot', 'antibody', 'synthesis', 'peptide', 'oligo', 'cloning', 'crispr',
+    'knockout', 'cell', 'culture', 'stem', 'organoid', 'histology', 'staining', 'imaging', 'mri',
+    'assay', 'screening', 'toxicology', 'pharmacokinetics', 'metabolomics', 'lipidomics', 'hplc',
+    'chromatography', 'bioinformatics', 'analysis', 'statistics', 'single', 'spatial', 'transcriptomics',
+    'methylation', 'chip', 'atac', 'library', 'prep', 'validation', 'calibration', 'sterility', 'gmp',
+)
+ACCREDITATIONS = ('ISO 17025', 'ISO 9001', 'GLP', 'GMP', 'CLIA', 'CAP', None)
+
+
+# (name, description, accreditation) for the index-th synthetic service
+def synthetic_service(rng, index):
+    name = ' '.join(rng.sample(TERMS, 3)) + f' {index}'
+    description = ' '.join(rng.choices(TERMS, k=rng.randint(20, 60)))
+    return name, description, rng.choice(ACCREDITATIONS)
+
+
+def synthetic_query(rng):
+    return ' '.join(rng.sample(TERMS, rng.randint(1, 4)))
+
+
+def requester_email(index):
+    return f'researcher{index}@example.org'
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def new_rng(seed=7):
+    return random.Random(seed)
@@ -0,0 +1,185 @@
+"""Throughput and latency of the main routes against a seeded database.
+
+Seed first (python -m benchmarks.seed), then run every scenario, or a
+subset, with concurrent clients. The AI assistant uses a deterministic fake
+LLM with configurable latency. Results are written as JSON for
+python -m benchmarks.compare:
+
+    DATABASE_URL=sqlite:////tmp/bench.db python -m benchmarks.load --requests 500 --concurrency 8 --output results.json
+"""
+import argparse
+import itertools
+import json
+import re
+import subprocess
+import threading
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import func, select
+
+from app import create_app, llm
+from app.extensions import db
+from app.llm import FakeLLMBackend
+from app.models import ServiceRequest, SupplierService
+from benchmarks.data import new_rng, percentile, synthetic_query
+
+SCENARIOS = ('service_list', 'ai_search', 'my_requests', 'view_requests', 'delete_service')
+
+_CANDIDATE_RE = re.compile(r'^\[(\d+)\]', re.MULTILINE)
+
+
+# Deterministic stand-in for the Groq answer: recommends the first shortlisted
+# candidates, so the benchmark exercises the same parsing as real answers
+def recommending_answer(messages):
+    service_ids = [int(service_id) for service_id in _CANDIDATE_RE.findall(messages[0]["content"])[:3]]
+    return json.dumps({"insights": f'Synthetic insights for: {messages[-1]["content"]}', "service_ids": service_ids})
+
+
+# Each scenario turns an iteration number into one request on the test client
+def _scenarios(app, rng, unique_queries):
+    with app.app_context():
+        service_ids = db.session.scalars(select(SupplierService.service_id).order_by(SupplierService.service_id)).all()
+        busy_services = db.session.scalars(
+            select(ServiceRequest.service_id).group_by(ServiceRequest.service_id)
+            .order_by(func.count().desc()).limit(100)
+        ).all()
+        emails = db.session.scalars(select(ServiceRequest.email).distinct().limit(1000)).all()
+    if not service_ids:
+        raise SystemExit('The database has no services; run python -m benchmarks.seed first.')
+
+    queries = [synthetic_query(rng) for _ in range(unique_queries)]
+    request_pages = busy_services or service_ids
+    # Deletes take services from the end of the catalog, each one once
+    doomed = iter(reversed(service_ids))
+    doomed_lock = threading.Lock()
+
+    def delete_service(client, iteration):
+        with doomed_lock:
+            service_id = next(doomed)
+        return client.post(f'/supplier/delete/{service_id}')
+
+    return {
+        "service_list": lambda client, iteration: client.get('/user/services'),
+        "ai_search": lambda client, iteration: client.post(
+            '/user/ai_search', json={"query": queries[iteration % len(queries)]}
+        ),
+        "my_requests": lambda client, iteration: client.get(
+            '/user/my_requests', query_string={"email": emails[iteration % len(emails)]}
+        ),
+        "view_requests": lambda client, iteration: client.get(
+            f'/supplier/service_requests/{request_pages[iteration % len(request_pages)]}'
+        ),
+        "delete_service": delete_service,
+    }
+
+
+def run_scenario(app, request_fn, requests, concurrency):
+    counter = itertools.count()
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def worker():
+        client = app.test_client()
+        while True:
+            iteration = next(counter)
+            if iteration >= requests:
+                return
+            started = time.perf_counter()
+            try:
+                response = request_fn(client, iteration)
+                failed = response.status_code >= 400
+            except Exception:
+                failed = True
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                latencies.append(elapsed)
+                if failed:
+                    errors.append(iteration)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "throughput_rps": round(len(latencies) / wall, 1),
+        "latency_ms_p50": round(percentile(latencies, 50), 2),
+        "latency_ms_p95": round(percentile(latencies, 95), 2),
+        "latency_ms_p99": round(percentile(latencies, 99), 2),
+        "latency_ms_max": round(max(latencies), 2),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _row_counts():
+    return {
+        "services": db.session.scalar(select(func.count()).select_from(SupplierService)),
+        "requests": db.session.scalar(select(func.count()).select_from(ServiceRequest)),
+    }
+
+
+def run(scenarios, requests, concurrency, llm_latency, unique_queries, seed=7):
+    app = create_app()
+    # Let the fake LLM, not admission control, bound ai_search throughput
+    app.config.update(LLM_RATE_LIMIT=100000, LLM_RATE_BURST=100000, LLM_QUEUE_SIZE=max(16, concurrency * 2))
+    llm.init_app(app)
+    app.extensions['llm_backend'] = FakeLLMBackend(
+        response=recommending_answer, first_token_delay=llm_latency, chunk_delay=0.0
+    )
+    available = _scenarios(app, new_rng(seed), unique_queries)
+
+    with app.app_context():
+        database = {"dialect": db.engine.dialect.name, **_row_counts()}
+
+    results = {}
+    for name in scenarios:
+        results[name] = run_scenario(app, available[name], requests, concurrency)
+
+    return {
+        "benchmark": "load",
+        "commit": _git_commit(),
+        "started_at": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        "database": database,
+        "requests": requests,
+        "concurrency": concurrency,
+        "llm_latency": llm_latency,
+        "unique_queries": unique_queries,
+        "scenarios": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scenario', action='append', choices=SCENARIOS, help='Run only this scenario (repeatable).')
+    parser.add_argument('--requests', type=int, default=200, help='Requests per scenario.')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--llm-latency', type=float, default=0.2, help='Seconds the fake LLM takes per answer.')
+    parser.add_argument('--unique-queries', type=int, default=50, help='Distinct ai_search questions; repeats hit the answer cache.')
+    parser.add_argument('--output', help='Also write the results to this JSON file.')
+    args = parser.parse_args()
+
+    result = run(args.scenario or SCENARIOS, args.requests, args.concurrency, args.llm_latency, args.unique_queries)
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Retrieval latency benchmark for the ai_search shortlist index.
+
+Builds the BM25 index over a synthetic catalog, then times incremental
+refreshes and top-k queries. Runs without a database:
+
+    python -m benchmarks.retrieval --services 100000
+"""
+import argparse
+import json
+import statistics
+import time
+
+from app.catalog import ServiceSnapshot
+from app.retrieval import ServiceRetriever
+from benchmarks.data import TERMS, new_rng, percentile, synthetic_query, synthetic_service
+
+
+def synthetic_catalog(count, seed=7):
+    rng = new_rng(seed)
+    return [ServiceSnapshot(service_id, *synthetic_service(rng, service_id)) for service_id in range(1, count + 1)]
+
+
+def run(services, queries, top_k, changed, seed=7):
+    rng = new_rng(seed)
+    catalog = synthetic_catalog(services, seed)
+    retriever = ServiceRetriever()
+
+    started = time.perf_counter()
+    retriever.refresh(catalog, 1)
+    build_seconds = time.perf_counter() - started
+
+    # Edit a slice of the catalog, as suppliers would between versions
+    for index in rng.sample(range(services), min(changed, services)):
+        snapshot = catalog[index]
+        catalog[index] = snapshot._replace(service_description=snapshot.service_description + ' ' + rng.choice(TERMS))
+    started = time.perf_counter()
+    retriever.refresh(catalog, 2)
+    refresh_seconds = time.perf_counter() - started
+
+    latencies = []
+    for _ in range(queries):
+        query = synthetic_query(rng)
+        started = time.perf_counter()
+        retriever.top_k(query, top_k)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    return {
+        "benchmark": "retrieval",
+        "services": services,
+        "queries": queries,
+        "top_k": top_k,
+        "build_seconds": round(build_seconds, 3),
+        "incremental_refresh_seconds": round(refresh_seconds, 3),
+        "changed_services": changed,
+        "query_ms_p50": round(statistics.median(latencies), 3),
+        "query_ms_p95": round(percentile(latencies, 95), 3),
+        "query_ms_p99": round(percentile(latencies, 99), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--services', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--top-k', type=int, default=20)
+    parser.add_argument('--changed', type=int, default=100)
+    args = parser.parse_args()
+    print(json.dumps(run(args.services, args.queries, args.top_k, args.changed), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""Seed synthetic suppliers, services, requests and responses.
+
+Writes deterministic data in batches (COPY on Postgres) to the database in
+DATABASE_URL, upgrading the schema first. Scales from a few thousand to
+millions of rows:
+
+    DATABASE_URL=sqlite:////tmp/bench.db python -m benchmarks.seed --services 10000 --requests 100000
+"""
+import argparse
+import json
+import time
+
+from flask_migrate import upgrade
+from sqlalchemy import delete, func, select
+
+from app import create_app
+from app.catalog import catalog_cache
+from app.catalog_io import write_batch
+from app.extensions import db
+from app.models import ServiceRequest, ServiceRequestStats, ServiceResponse, Supplier, SupplierService
+from app.request_stats import rebuild_request_stats
+from benchmarks.data import new_rng, requester_email, synthetic_service
+
+BATCH_SIZE = 5000
+
+
+def _write(model, rows):
+    table = model.__table__
+    batch = []
+    count = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            write_batch(table, list(batch[0]), batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        write_batch(table, list(batch[0]), batch)
+        count += len(batch)
+    db.session.commit()
+    return count
+
+
+# Ids assigned to the rows written since the previous maximum id
+def _new_ids(column, after):
+    return db.session.scalars(select(column).where(column > after).order_by(column)).all()
+
+
+def _max_id(column):
+    return db.session.scalar(select(func.max(column))) or 0
+
+
+def seed(services, requests, response_ratio=0.5, services_per_supplier=100, emails=None, seed=7):
+    rng = new_rng(seed)
+    emails = emails or max(1, requests // 10)
+    timings = {}
+
+    started = time.perf_counter()
+    after = _max_id(Supplier.supplier_id)
+    supplier_count = max(1, services // services_per_supplier)
+    _write(Supplier, ({"name": f'Synthetic Lab {index}', "company_description": None} for index in range(supplier_count)))
+    supplier_ids = _new_ids(Supplier.supplier_id, after)
+    timings["suppliers"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    after = _max_id(SupplierService.service_id)
+
+    def service_rows():
+        for index in range(services):
+            name, description, accreditation = synthetic_service(rng, index)
+            yield {
+                "service_name": name,
+                "service_description": description,
+                "accreditation": accreditation,
+                "supplier_id": supplier_ids[index % len(supplier_ids)],
+            }
+    _write(SupplierService, service_rows())
+    service_ids = _new_ids(SupplierService.service_id, after)
+    timings["services"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    after = _max_id(ServiceRequest.request_id)
+
+    def request_rows():
+        for index in range(requests):
+            yield {
+                "service_id": rng.choice(service_ids),
+                "user_name": f'Researcher {index % emails}',
+                "phone_number": f'555{index % 10000000:07d}',
+                "email": requester_email(index % emails),
+                "research_description": f'Synthetic request {index}',
+            }
+    _write(ServiceRequest, request_rows())
+    timings["requests"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+
+    def response_rows():
+        rows = db.session.execute(
+            select(ServiceRequest.request_id, SupplierService.supplier_id)
+            .join(SupplierService, SupplierService.service_id == ServiceRequest.service_id)
+            .where(ServiceRequest.request_id > after)
+            .order_by(ServiceRequest.request_id)
+            .execution_options(yield_per=BATCH_SIZE)
+        )
+        for request_id, supplier_id in rows:
+            if rng.random() < response_ratio:
+                yield {
+                    "request_id": request_id,
+                    "supplier_id": supplier_id,
+                    "response_details": f'Quote for request {request_id}',
+                    "price": round(rng.uniform(50, 5000), 2),
+                }
+    responses = _write(ServiceResponse, response_rows())
+    timings["responses"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    rebuild_request_stats()
+    timings["request_stats"] = time.perf_counter() - started
+
+    # The seeded catalog must not be served from caches built before it
+    catalog_cache.bump()
+
+    return {
+        "benchmark": "seed",
+        "dialect": db.engine.dialect.name,
+        "suppliers": len(supplier_ids),
+        "services": len(service_ids),
+        "requests": requests,
+        "responses": responses,
+        "seconds": {name: round(seconds, 2) for name, seconds in timings.items()},
+    }
+
+
+# Remove every supplier, service, request, response and request counter
+def reset():
+    for model in (ServiceRequestStats, ServiceResponse, ServiceRequest, SupplierService, Supplier):
+        db.session.execute(delete(model))
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--services', type=int, default=1000)
+    parser.add_argument('--requests', type=int, default=10000)
+    parser.add_argument('--response-ratio', type=float, default=0.5, help='Share of requests that get a response.')
+    parser.add_argument('--emails', type=int, help='Distinct requester emails (default: requests / 10).')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--reset', action='store_true', help='Delete existing suppliers, services, requests and responses first.')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        upgrade()
+        if args.reset:
+            reset()
+        result = seed(args.services, args.requests, args.response_ratio, emails=args.emails, seed=args.seed)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
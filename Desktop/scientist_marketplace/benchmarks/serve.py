@@ -0,0 +1,177 @@
+"""HTTP throughput of the dev server against the production gunicorn setup.
+
+Starts the chosen server on a seeded database, drives it with concurrent
+keep-alive clients over real sockets and stops it with SIGTERM. Results use
+the benchmarks.load format, so two servers compare like two commits:
+
+    DATABASE_URL=sqlite:////tmp/bench.db python -m benchmarks.serve --server dev --output dev.json
+    DATABASE_URL=sqlite:////tmp/bench.db python -m benchmarks.serve --server gunicorn --output gunicorn.json
+    python -m benchmarks.compare dev.json gunicorn.json
+"""
+import argparse
+import http.client
+import itertools
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import select
+
+from app import create_app
+from app.extensions import db
+from app.models import Product, SupplierService
+from benchmarks.data import new_rng, percentile
+from benchmarks.load import _git_commit, _row_counts
+
+SCENARIOS = ('service_list', 'service_details', 'products', 'healthz')
+
+SERVERS = {
+    "dev": lambda port, workers: [sys.executable, '-m', 'flask', 'run', '--no-reload', '--port', str(port)],
+    "gunicorn": lambda port, workers: [
+        sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}',
+        '--workers', str(workers),
+    ],
+}
+
+
+# Each scenario turns an iteration number into a request path
+def _paths(rng):
+    app = create_app()
+    with app.app_context():
+        service_ids = db.session.scalars(select(SupplierService.service_id).limit(1000)).all()
+        supplier_ids = db.session.scalars(select(Product.supplier_id).distinct().limit(100)).all()
+        database = {"dialect": db.engine.dialect.name, **_row_counts()}
+    if not service_ids:
+        raise SystemExit('The database has no services; run python -m benchmarks.seed first.')
+    rng.shuffle(service_ids)
+    return database, {
+        "service_list": lambda iteration: '/user/services',
+        "service_details": lambda iteration: f'/user/services/{service_ids[iteration % len(service_ids)]}',
+        "products": lambda iteration: (
+            f'/user/products?in_stock=true&supplier_id={supplier_ids[iteration % len(supplier_ids)]}'
+            if supplier_ids else '/user/products'
+        ),
+        "healthz": lambda iteration: '/healthz',
+    }
+
+
+def start_server(server, port, workers):
+    env = dict(os.environ, FLASK_APP='run.py')
+    process = subprocess.Popen(SERVERS[server](port, workers), env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline and process.poll() is None:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/healthz')
+            if connection.getresponse().status == 200:
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise SystemExit(f'{server} did not become healthy on port {port}')
+
+
+def stop_server(process):
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def run_scenario(port, path_fn, requests, concurrency):
+    counter = itertools.count()
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def worker():
+        # Reconnects on its own whenever the server closes the connection
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        while True:
+            iteration = next(counter)
+            if iteration >= requests:
+                connection.close()
+                return
+            started = time.perf_counter()
+            try:
+                connection.request('GET', path_fn(iteration))
+                response = connection.getresponse()
+                response.read()
+                failed = response.status >= 400
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                failed = True
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                latencies.append(elapsed)
+                if failed:
+                    errors.append(iteration)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "throughput_rps": round(len(latencies) / wall, 1),
+        "latency_ms_p50": round(percentile(latencies, 50), 2),
+        "latency_ms_p95": round(percentile(latencies, 95), 2),
+        "latency_ms_p99": round(percentile(latencies, 99), 2),
+        "latency_ms_max": round(max(latencies), 2),
+    }
+
+
+def run(server, scenarios, requests, concurrency, workers, port, seed=7):
+    database, available = _paths(new_rng(seed))
+    started_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+    process = start_server(server, port, workers)
+    try:
+        results = {name: run_scenario(port, available[name], requests, concurrency) for name in scenarios}
+    finally:
+        stop_server(process)
+
+    return {
+        "benchmark": "serve",
+        "server": server,
+        "workers": workers if server == 'gunicorn' else 1,
+        "commit": _git_commit(),
+        "started_at": started_at,
+        "database": database,
+        "requests": requests,
+        "concurrency": concurrency,
+        "scenarios": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--server', choices=sorted(SERVERS), default='gunicorn')
+    parser.add_argument('--scenario', action='append', choices=SCENARIOS, help='Run only this scenario (repeatable).')
+    parser.add_argument('--requests', type=int, default=1000, help='Requests per scenario.')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--workers', type=int, default=1, help='gunicorn worker processes; more than one needs CATALOG_SHARED_CACHE.')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--output', help='Also write the results to this JSON file.')
+    args = parser.parse_args()
+
+    result = run(args.server, args.scenario or SCENARIOS, args.requests, args.concurrency, args.workers, args.port)
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+
+
+if __name__ == '__main__':
+    main()
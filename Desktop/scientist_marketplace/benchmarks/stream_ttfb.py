@@ -0,0 +1,80 @@
+"""Time-to-first-byte of ai_search vs its streaming variant.
+
+Uses the fake LLM backend so the numbers reflect the app, not the provider.
+The answer cache is cleared before every sample, so each one measures a
+model call rather than a cached replay. Runs against the database in DATABASE_URL:
+
+    python -m benchmarks.stream_ttfb --requests 20 --first-token-delay 0.5 --chunk-delay 0.02
+"""
+import argparse
+import json
+import statistics
+import time
+
+from app import create_app
+from app.assistant import answer_cache
+from app.llm import FakeLLMBackend
+
+
+def time_blocking(client, query):
+    started = time.perf_counter()
+    client.post('/user/ai_search', json={"query": query})
+    elapsed = (time.perf_counter() - started) * 1000
+    return elapsed, elapsed
+
+
+# The test client yields the body as the view generates it, so the first
+# frame with content marks when a browser would start rendering: a token, or
+# the first service or answer of a cached replay
+def time_streaming(client, query):
+    started = time.perf_counter()
+    response = client.post('/user/ai_search/stream', json={"query": query}, buffered=False)
+    first_token = None
+    for frame in response.response:
+        if first_token is None and frame.strip() and not frame.startswith(b'event: start'):
+            first_token = (time.perf_counter() - started) * 1000
+    response.close()
+    return first_token, (time.perf_counter() - started) * 1000
+
+
+def sample(timer, client, query):
+    answer_cache.clear()
+    return timer(client, query)
+
+
+def summarize(samples):
+    return {
+        "first_token_ms_p50": round(statistics.median(first for first, _ in samples), 1),
+        "total_ms_p50": round(statistics.median(total for _, total in samples), 1),
+    }
+
+
+def run(requests, first_token_delay, chunk_delay, query):
+    app = create_app()
+    app.extensions['llm_backend'] = FakeLLMBackend(first_token_delay=first_token_delay, chunk_delay=chunk_delay)
+    client = app.test_client()
+
+    blocking = [sample(time_blocking, client, query) for _ in range(requests)]
+    streaming = [sample(time_streaming, client, query) for _ in range(requests)]
+    return {
+        "benchmark": "stream_ttfb",
+        "requests": requests,
+        "first_token_delay": first_token_delay,
+        "chunk_delay": chunk_delay,
+        "ai_search": summarize(blocking),
+        "ai_search_stream": summarize(streaming),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=20)
+    parser.add_argument('--first-token-delay', type=float, default=0.5)
+    parser.add_argument('--chunk-delay', type=float, default=0.02)
+    parser.add_argument('--query', default='PCR sequencing')
+    args = parser.parse_args()
+    print(json.dumps(run(args.requests, args.first_token_delay, args.chunk_delay, args.query), indent=2))
+
+
+if __name__ == '__main__':
+    main()
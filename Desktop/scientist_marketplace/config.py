@@ -8,3 +8,52 @@ class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', '629059fa5288ee02e6dc0c0cf6adcee1')  # Defaulting to your provided key
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'postgresql://rishi@localhost/ecommerce')
     SQLALCHEMY_TRACK_MODIFICATIONS = False  # Disable event system to save resources
+    DATABASE_REPLICA_URLS = [url for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url]  # Read replicas for read-only routes
+    READ_YOUR_WRITES_SECONDS = float(os.getenv('READ_YOUR_WRITES_SECONDS', 5))  # Reads stay on the primary this long after a client's write
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))  # Connections kept open per engine and process
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))  # Extra connections allowed under load
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 10))  # Seconds to wait for a free connection
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))  # Seconds before a connection is replaced
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')  # Check connections before use
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 0))  # Postgres statement_timeout, 0 for none
+    RAISE_ON_LAZY_LOAD = os.getenv('RAISE_ON_LAZY_LOAD').lower() in ('1', 'true', 'yes') if os.getenv('RAISE_ON_LAZY_LOAD') else None  # Unplanned lazy loads of relationships raise; unset follows debug mode
+    QUERY_INSTRUMENTATION = os.getenv('QUERY_INSTRUMENTATION', 'off')  # 'off', 'log' or 'raise' on repeated statements per request
+    QUERY_REPEAT_THRESHOLD = int(os.getenv('QUERY_REPEAT_THRESHOLD', 3))  # Identical statements per request that count as an N+1
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes')  # Serve Prometheus metrics at /metrics
+    ETAG_RELEASE = os.getenv('RELEASE', '')  # Mixed into page ETags so a deploy invalidates cached pages
+    HTTP_CACHE_SHARED_MAX_AGE = int(os.getenv('HTTP_CACHE_SHARED_MAX_AGE', 60))  # s-maxage a reverse proxy may serve anonymous catalog pages for
+    PAGE_SIZE = int(os.getenv('PAGE_SIZE', 25))  # Rows per page on list views
+    CATALOG_CACHE_SIZE = int(os.getenv('CATALOG_CACHE_SIZE', 256))  # Cached catalog entries per process
+    CATALOG_CACHE_TTL = int(os.getenv('CATALOG_CACHE_TTL', 300))  # Seconds before a cached entry is reloaded
+    FRAGMENT_CACHE_SIZE = int(os.getenv('FRAGMENT_CACHE_SIZE', 10000))  # Rendered template fragments kept per process
+    CATALOG_SHARED_CACHE = os.getenv('CATALOG_SHARED_CACHE')  # redis:// URL or factory import path of a shared cache tier; required for more than one process
+    LLM_BACKEND = os.getenv('LLM_BACKEND', 'groq')  # 'groq', 'fake' for the local canned backend, or a factory import path
+    GROQ_API_KEY = os.getenv('GROQ_API_KEY')  # Only needed once the AI assistant is called
+    LLM_MODEL = os.getenv('LLM_MODEL', 'deepseek-r1-distill-llama-70b')  # Chat model requested from the provider
+    FAKE_LLM_FIRST_TOKEN_DELAY = float(os.getenv('FAKE_LLM_FIRST_TOKEN_DELAY', 0.5))  # Seconds before the fake backend's first chunk
+    FAKE_LLM_CHUNK_DELAY = float(os.getenv('FAKE_LLM_CHUNK_DELAY', 0.02))  # Seconds between the fake backend's chunks
+    LLM_WORKERS = int(os.getenv('LLM_WORKERS', 4))  # Threads dedicated to LLM calls
+    LLM_QUEUE_SIZE = int(os.getenv('LLM_QUEUE_SIZE', 16))  # LLM calls allowed to wait for a worker
+    LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', 30))  # Seconds before an LLM call is abandoned
+    LLM_RATE_LIMIT = float(os.getenv('LLM_RATE_LIMIT', 5))  # LLM calls admitted per second
+    LLM_RATE_BURST = int(os.getenv('LLM_RATE_BURST', 10))  # Burst of LLM calls admitted at once
+    LLM_BREAKER_FAILURES = int(os.getenv('LLM_BREAKER_FAILURES', 5))  # Consecutive failures that open the circuit
+    LLM_BREAKER_RESET = float(os.getenv('LLM_BREAKER_RESET', 30))  # Seconds before a trial call after opening
+    AI_CACHE_SIZE = int(os.getenv('AI_CACHE_SIZE', 1024))  # Cached ai_search answers per process
+    AI_CACHE_TTL = int(os.getenv('AI_CACHE_TTL', 3600))  # Seconds a cached ai_search answer stays valid
+    AI_SEARCH_TOP_K = int(os.getenv('AI_SEARCH_TOP_K', 20))  # Candidate services included in the AI prompt
+    CHAT_LOG_BATCH_SIZE = int(os.getenv('CHAT_LOG_BATCH_SIZE', 100))  # Chat turns per INSERT batch
+    CHAT_LOG_FLUSH_INTERVAL = float(os.getenv('CHAT_LOG_FLUSH_INTERVAL', 1.0))  # Seconds between chat log flushes
+    CHAT_LOG_MAX_PENDING = int(os.getenv('CHAT_LOG_MAX_PENDING', 10000))  # Buffered chat turns before new ones are dropped
+    JOB_CONCURRENCY = int(os.getenv('JOB_CONCURRENCY', 4))  # Threads per flask jobs work process
+    JOB_CLAIM_BATCH = int(os.getenv('JOB_CLAIM_BATCH', 10))  # Jobs a worker thread claims per round trip
+    JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', 1.0))  # Seconds a worker sleeps when no job is due
+    JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 5))  # Attempts before a job is marked failed
+    JOB_RETRY_BASE = float(os.getenv('JOB_RETRY_BASE', 10))  # Seconds before the first retry, doubling after each failure
+    JOB_RETRY_MAX = float(os.getenv('JOB_RETRY_MAX', 3600))  # Longest wait between retries
+    JOB_TIMEOUT = int(os.getenv('JOB_TIMEOUT', 600))  # Seconds a job may run before its worker is presumed dead
+    JOB_RETENTION = int(os.getenv('JOB_RETENTION', 86400))  # Seconds finished jobs are kept before purging
+    JOB_MAINTENANCE_INTERVAL = int(os.getenv('JOB_MAINTENANCE_INTERVAL', 60))  # Seconds between stale-job and purge sweeps
+    IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', 1000))  # Rows per INSERT/COPY batch in catalog imports
+    PRODUCT_FACET_LIMIT = int(os.getenv('PRODUCT_FACET_LIMIT', 20))  # Most common values returned per product facet
+    SEARCH_RESULT_LIMIT = int(os.getenv('SEARCH_RESULT_LIMIT', 50))  # Max services returned by a keyword search
@@ -0,0 +1,60 @@
+"""Production server settings, picked up by running gunicorn from this directory.
+
+    gunicorn
+
+Every setting can be overridden with the environment variables below or on
+the command line. Caches and /metrics are per process: more than one worker
+needs CATALOG_SHARED_CACHE, and each scrape of /metrics only describes the
+worker that answered it.
+"""
+import multiprocessing
+import os
+import sys
+
+from app import serving
+from app.catalog import shared_across_processes
+
+wsgi_app = 'run:app'
+
+bind = os.getenv('BIND', f'0.0.0.0:{os.getenv("PORT", 8000)}')
+# Processes serving requests: one per CPU once the catalog cache is shared, else one
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() if os.getenv('CATALOG_SHARED_CACHE') else 1))
+worker_class = 'gthread'
+threads = int(os.getenv('WEB_THREADS', 4))  # Threads per process, for requests waiting on the database or LLM
+keepalive = int(os.getenv('WEB_KEEPALIVE', 5))  # Seconds an idle client connection is kept open
+timeout = int(os.getenv('WEB_TIMEOUT', 60))  # Seconds of silence before a worker is killed and replaced
+graceful_timeout = int(os.getenv('WEB_GRACEFUL_TIMEOUT', 30))  # Seconds in-flight requests get to finish on shutdown
+max_requests = int(os.getenv('WEB_MAX_REQUESTS', 0))  # Requests before a worker is recycled (0 = never)
+max_requests_jitter = int(os.getenv('WEB_MAX_REQUESTS_JITTER', 0))  # Random extra requests so workers don't recycle together
+
+# Import the app in the master, before forking, so it is warmed up once
+preload_app = True
+
+accesslog = os.getenv('WEB_ACCESS_LOG', '-') or None  # Access log path, '-' for stdout, empty to disable
+errorlog = '-'
+
+
+def _app(server):
+    return server.app.wsgi()
+
+
+# Runs in the master after the app is loaded and before workers are forked
+def when_ready(server):
+    if server.cfg.workers > 1 and not shared_across_processes():
+        server.log.error(
+            'Refusing to start %d workers: without a cross-process CATALOG_SHARED_CACHE each would '
+            'serve stale catalog pages after another one\'s edits', server.cfg.workers
+        )
+        sys.exit(1)
+    services = serving.warm_up(_app(server))
+    server.log.info('Warmed up the catalog (%d services)', services)
+
+
+def post_fork(server, worker):
+    serving.reset_engines(_app(server))
+
+
+# SIGTERM: the worker stops accepting, finishes its requests within
+# graceful_timeout, then writes what it still buffers
+def worker_exit(server, worker):
+    serving.shutdown_worker()
@@ -0,0 +1,36 @@
+"""Add updated_at to supplier services
+
+Revision ID: a33c5857765d
+Revises: 1cf87c65c7d9
+Create Date: 2026-10-18 09:15:28.333777
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a33c5857765d'
+down_revision = '1cf87c65c7d9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Rebuilding supplier_services on SQLite would drop its FTS triggers, so add
+    # the column with a constant default there and backfill it instead
+    if op.get_bind().dialect.name == 'sqlite':
+        op.add_column('supplier_services', sa.Column(
+            'updated_at', sa.DateTime(), server_default=sa.text("'1970-01-01 00:00:00'"), nullable=False
+        ))
+        op.execute('UPDATE supplier_services SET updated_at = CURRENT_TIMESTAMP')
+    else:
+        op.add_column('supplier_services', sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=False))
+    op.create_index(op.f('ix_supplier_services_updated_at'), 'supplier_services', ['updated_at'], unique=False)
+
+
+def downgrade():
+    # A batch rebuild would drop the FTS triggers on SQLite too; plain ALTER
+    # TABLE ... DROP COLUMN (SQLite 3.35+) keeps the table and its triggers
+    op.drop_index(op.f('ix_supplier_services_updated_at'), table_name='supplier_services')
+    op.drop_column('supplier_services', 'updated_at')
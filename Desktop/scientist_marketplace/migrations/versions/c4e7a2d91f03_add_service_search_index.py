@@ -0,0 +1,75 @@
+"""Add full-text search index for supplier services
+
+Revision ID: c4e7a2d91f03
+Revises: b89c1151809c
+Create Date: 2026-10-18 09:12:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e7a2d91f03'
+down_revision = 'b89c1151809c'
+branch_labels = None
+depends_on = None
+
+
+SQLITE_FTS_DDL = (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS supplier_services_fts USING fts5(
+        service_name, service_description, accreditation,
+        content='supplier_services', content_rowid='service_id'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS supplier_services_fts_ai AFTER INSERT ON supplier_services BEGIN
+        INSERT INTO supplier_services_fts(rowid, service_name, service_description, accreditation)
+        VALUES (new.service_id, new.service_name, new.service_description, new.accreditation);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS supplier_services_fts_ad AFTER DELETE ON supplier_services BEGIN
+        INSERT INTO supplier_services_fts(supplier_services_fts, rowid, service_name, service_description, accreditation)
+        VALUES ('delete', old.service_id, old.service_name, old.service_description, old.accreditation);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS supplier_services_fts_au AFTER UPDATE ON supplier_services BEGIN
+        INSERT INTO supplier_services_fts(supplier_services_fts, rowid, service_name, service_description, accreditation)
+        VALUES ('delete', old.service_id, old.service_name, old.service_description, old.accreditation);
+        INSERT INTO supplier_services_fts(rowid, service_name, service_description, accreditation)
+        VALUES (new.service_id, new.service_name, new.service_description, new.accreditation);
+    END""",
+    "INSERT INTO supplier_services_fts(supplier_services_fts) VALUES ('rebuild')",
+)
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        # Weighted tsvector kept current by Postgres itself: name (A) outranks
+        # accreditation (B), which outranks the description (C)
+        op.execute("""
+            ALTER TABLE supplier_services ADD COLUMN search_vector tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('english', coalesce(service_name, '')), 'A') ||
+                setweight(to_tsvector('english', coalesce(accreditation, '')), 'B') ||
+                setweight(to_tsvector('english', coalesce(service_description, '')), 'C')
+            ) STORED
+        """)
+        op.create_index(
+            'ix_supplier_services_search_vector', 'supplier_services', ['search_vector'],
+            postgresql_using='gin'
+        )
+    elif dialect == 'sqlite':
+        for statement in SQLITE_FTS_DDL:
+            op.execute(statement)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.drop_index('ix_supplier_services_search_vector', table_name='supplier_services')
+        op.drop_column('supplier_services', 'search_vector')
+    elif dialect == 'sqlite':
+        op.execute('DROP TRIGGER IF EXISTS supplier_services_fts_au')
+        op.execute('DROP TRIGGER IF EXISTS supplier_services_fts_ad')
+        op.execute('DROP TRIGGER IF EXISTS supplier_services_fts_ai')
+        op.execute('DROP TABLE IF EXISTS supplier_services_fts')
@@ -0,0 +1,83 @@
+import os
+
+# Config reads the environment when it is imported, so point it at an
+# in-memory database and the canned LLM before the app is loaded
+os.environ['DATABASE_URL'] = 'sqlite://'
+os.environ['DATABASE_REPLICA_URLS'] = ''
+os.environ.pop('CATALOG_SHARED_CACHE', None)
+os.environ['LLM_BACKEND'] = 'fake'
+os.environ['FAKE_LLM_FIRST_TOKEN_DELAY'] = '0'
+os.environ['FAKE_LLM_CHUNK_DELAY'] = '0'
+os.environ['RAISE_ON_LAZY_LOAD'] = 'true'
+
+import pytest
+from sqlalchemy import text
+
+from app import create_app
+from app.catalog import catalog_cache
+from app.chat_log import chat_log
+from app.extensions import db
+from app.models import Supplier, SupplierService
+from app.search import SQLITE_FTS_DDL
+
+
+# A fresh in-memory database per test, with the full-text index the
+# migrations would have created
+@pytest.fixture
+def app():
+    app = create_app()
+    app.config.update(TESTING=True)
+    with app.app_context():
+        db.create_all()
+        for statement in SQLITE_FTS_DDL:
+            db.session.execute(text(statement))
+        db.session.commit()
+        # Caches are per process; start each test on a new catalog version
+        catalog_cache.bump()
+        yield app
+        chat_log.flush()
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def supplier(app):
+    supplier = Supplier(name='Core Facility')
+    db.session.add(supplier)
+    db.session.commit()
+    return supplier
+
+
+# Call with a name (and optional description) to add a service
+@pytest.fixture
+def make_service(supplier):
+    def make(service_name, service_description='', accreditation=None):
+        service = SupplierService(
+            service_name=service_name,
+            service_description=service_description or f'{service_name} service',
+            accreditation=accreditation,
+            supplier_id=supplier.supplier_id,
+        )
+        db.session.add(service)
+        db.session.commit()
+        return service
+    return make
+
+
+# Call with a service id (and optional email) to submit a request through
+# the app, the way a visitor would
+@pytest.fixture
+def submit_request(client):
+    def submit(service_id, email='researcher@example.org', description='Sequencing run'):
+        return client.post(f'/user/services/{service_id}/request', data={
+            "user_name": 'Researcher',
+            "phone_number": '555-0100',
+            "email": email,
+            "research_description": description,
+        })
+    return submit
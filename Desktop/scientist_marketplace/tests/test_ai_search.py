@@ -0,0 +1,95 @@
+import json
+
+import pytest
+
+from app.assistant import answer_cache
+from app.llm import FakeLLMBackend
+
+
+# Counts upstream calls, blocking or streamed
+class CountingBackend(FakeLLMBackend):
+    def __init__(self, response):
+        super().__init__(response=response, chunk_size=16)
+        self.calls = 0
+
+    def complete(self, messages):
+        self.calls += 1
+        return super().complete(messages)
+
+    def stream(self, messages):
+        self.calls += 1
+        return super().stream(messages)
+
+
+@pytest.fixture
+def service(make_service):
+    return make_service('PCR amplification', 'Quantitative PCR and sequencing')
+
+
+@pytest.fixture
+def backend(app, service):
+    backend = CountingBackend(json.dumps({"insights": 'Try PCR amplification.', "service_ids": [service.service_id]}))
+    app.extensions['llm_backend'] = backend
+    return backend
+
+
+def _events(response):
+    events = []
+    for frame in response.get_data(as_text=True).split('\n\n'):
+        if frame:
+            event, data = frame.split('\n', 1)
+            events.append((event.removeprefix('event: '), json.loads(data.removeprefix('data: '))))
+    return events
+
+
+def _stream(client, query):
+    response = client.post('/user/ai_search/stream', json={"query": query})
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    return _events(response)
+
+
+def test_stream_forwards_tokens_and_caches_the_answer(client, service, backend):
+    events = _stream(client, 'PCR sequencing')
+    names = [name for name, _ in events]
+    assert names[0] == 'start' and names[-1] == 'done'
+    assert 'token' in names
+    assert ''.join(data["text"] for name, data in events if name == 'token') == backend.response
+    assert [data["id"] for name, data in events if name == 'service'] == [service.service_id]
+
+    done = events[-1][1]
+    assert done["research_insights"] == 'Try PCR amplification.'
+    assert answer_cache.get('PCR sequencing')["services"] == done["services"]
+    assert backend.calls == 1
+
+
+def test_cached_answer_is_replayed_without_tokens(client, service, backend):
+    first = _stream(client, 'PCR sequencing')
+    replay = _stream(client, '  pcr   SEQUENCING ')
+
+    assert backend.calls == 1
+    assert [name for name, _ in replay] == ['start', 'service', 'done']
+    assert replay[1][1]["id"] == service.service_id
+    assert replay[-1][1]["services"] == first[-1][1]["services"]
+
+
+def test_blocking_and_streaming_share_the_cache(client, backend):
+    answer = client.post('/user/ai_search', json={"query": 'PCR sequencing'}).get_json()
+    assert backend.calls == 1
+
+    replay = _stream(client, 'PCR sequencing')
+    assert backend.calls == 1
+    assert replay[-1][1] == answer
+
+    assert client.post('/user/ai_search', json={"query": 'PCR sequencing'}).get_json() == answer
+    assert backend.calls == 1
+
+
+# A catalog edit bumps the version the cache is keyed by
+def test_catalog_change_invalidates_cached_answers(client, make_service, backend):
+    _stream(client, 'PCR sequencing')
+    make_service('Flow cytometry')
+    events = _stream(client, 'PCR sequencing')
+
+    assert backend.calls == 2
+    assert 'token' in [name for name, _ in events]
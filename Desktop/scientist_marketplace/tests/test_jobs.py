@@ -0,0 +1,113 @@
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import update
+
+from app.extensions import db
+from app.jobs import claim, enqueue, jobs, queue_stats, requeue_stale, run_job, task, utcnow
+from app.models import Job
+
+calls = []
+
+
+@task('test_record')
+def record(value):
+    calls.append(value)
+
+
+@task('test_fail')
+def fail():
+    raise RuntimeError('upstream down')
+
+
+@pytest.fixture(autouse=True)
+def reset_calls():
+    calls.clear()
+
+
+def _job(job_id):
+    db.session.expire_all()
+    return db.session.get(Job, job_id)
+
+
+# Make a retried job due again without waiting out its backoff
+def _make_due(job_id):
+    db.session.execute(update(jobs).where(jobs.c.job_id == job_id).values(run_at=utcnow()))
+    db.session.commit()
+
+
+def test_unknown_task_is_refused(app):
+    with pytest.raises(ValueError):
+        enqueue('no_such_task')
+
+
+def test_claim_takes_each_due_job_once(app):
+    first = enqueue('test_record', value=1)
+    second = enqueue('test_record', value=2)
+    later = enqueue('test_record', delay=3600, value=3)
+    db.session.commit()
+
+    claimed = claim('worker-a', limit=10)
+    assert [job.job_id for job in claimed] == [first.job_id, second.job_id]
+    assert all(job.attempts == 1 for job in claimed)
+    assert claim('worker-b', limit=10) == []
+
+    running = _job(first.job_id)
+    assert (running.status, running.locked_by) == ('running', 'worker-a')
+    assert _job(later.job_id).status == 'queued'
+
+
+def test_run_job_marks_done(app):
+    job = enqueue('test_record', value='hello')
+    db.session.commit()
+
+    [claimed] = claim('worker-a')
+    assert run_job(claimed)
+    assert calls == ['hello']
+    done = _job(job.job_id)
+    assert (done.status, done.locked_by, done.finished_at is not None) == ('done', None, True)
+
+
+def test_failed_job_is_retried_then_given_up(app):
+    app.config['JOB_MAX_ATTEMPTS'] = 2
+    job = enqueue('test_fail')
+    db.session.commit()
+
+    [claimed] = claim('worker-a')
+    assert not run_job(claimed)
+    retried = _job(job.job_id)
+    assert (retried.status, retried.attempts) == ('queued', 1)
+    assert retried.run_at > utcnow()
+    assert retried.last_error == 'RuntimeError: upstream down'
+    # Backing off: not due yet
+    assert claim('worker-a') == []
+
+    _make_due(job.job_id)
+    [claimed] = claim('worker-a')
+    assert not run_job(claimed)
+    failed = _job(job.job_id)
+    assert (failed.status, failed.attempts) == ('failed', 2)
+    assert queue_stats()["failed"] == 1
+
+
+def test_stale_running_job_is_requeued(app):
+    job = enqueue('test_record', value=1)
+    db.session.commit()
+    claim('worker-that-died')
+    db.session.execute(
+        update(jobs).where(jobs.c.job_id == job.job_id).values(started_at=utcnow() - timedelta(hours=1))
+    )
+    db.session.commit()
+
+    assert requeue_stale(timeout=60) == 1
+    [claimed] = claim('worker-b')
+    assert claimed.attempts == 2
+
+
+def test_submitting_a_request_queues_a_notification(make_service, submit_request):
+    service = make_service('PCR')
+    submit_request(service.service_id)
+
+    [claimed] = claim('worker-a')
+    assert claimed.name == 'notify_supplier'
+    assert run_job(claimed)
@@ -0,0 +1,76 @@
+import re
+
+from sqlalchemy import select
+
+from app.models import SupplierService
+from app.pagination import NEXT, decode_cursor, encode_cursor, keyset_paginate
+
+
+def _page(cursor=None, descending=False):
+    stmt = select(SupplierService.service_id, SupplierService.service_name)
+    return keyset_paginate(stmt, SupplierService.service_id, cursor=cursor, per_page=2, descending=descending)
+
+
+def _ids(page):
+    return [row.service_id for row in page]
+
+
+def test_cursor_round_trip(app):
+    assert decode_cursor(encode_cursor(NEXT, 42)) == (NEXT, 42)
+
+
+def test_tampered_cursor_restarts_from_first_page(app):
+    token = encode_cursor(NEXT, 42)
+    assert decode_cursor(token[:-2] + 'xx') == (NEXT, None)
+    assert decode_cursor('not-a-cursor') == (NEXT, None)
+    assert decode_cursor(None) == (NEXT, None)
+
+
+def test_walks_forward_and_back(make_service):
+    ids = [make_service(f'Service {index}').service_id for index in range(5)]
+
+    first = _page()
+    assert _ids(first) == ids[:2]
+    assert first.prev_cursor is None
+
+    second = _page(first.next_cursor)
+    assert _ids(second) == ids[2:4]
+
+    last = _page(second.next_cursor)
+    assert _ids(last) == ids[4:]
+    assert last.next_cursor is None
+
+    assert _ids(_page(last.prev_cursor)) == ids[2:4]
+    assert _ids(_page(second.prev_cursor)) == ids[:2]
+
+
+def test_descending_pages(make_service):
+    ids = [make_service(f'Service {index}').service_id for index in range(5)][::-1]
+
+    first = _page(descending=True)
+    assert _ids(first) == ids[:2]
+    second = _page(first.next_cursor, descending=True)
+    assert _ids(second) == ids[2:4]
+    assert _ids(_page(second.prev_cursor, descending=True)) == ids[:2]
+
+
+def test_empty_table(app):
+    page = _page()
+    assert len(page) == 0
+    assert page.next_cursor is None and page.prev_cursor is None
+
+
+def test_my_requests_pages_only_the_sessions_requests(client, app, make_service, submit_request):
+    app.config['PAGE_SIZE'] = 2
+    service = make_service('PCR')
+    submit_request(service.service_id, email='other@example.org', description='Not mine')
+    for index in range(3):
+        submit_request(service.service_id, description=f'Mine {index}')
+
+    first = client.get('/user/my_requests?email=other@example.org').get_data(as_text=True)
+    assert 'Mine 2' in first and 'Mine 1' in first
+    assert 'Mine 0' not in first and 'Not mine' not in first
+
+    cursor = re.search(r'cursor=([\w.-]+)', first).group(1)
+    second = client.get(f'/user/my_requests?cursor={cursor}').get_data(as_text=True)
+    assert 'Mine 0' in second and 'Mine 1' not in second and 'Not mine' not in second
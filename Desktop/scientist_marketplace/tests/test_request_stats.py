@@ -0,0 +1,56 @@
+from sqlalchemy import select
+
+from app.extensions import db
+from app.models import ServiceRequestStats
+from app.request_stats import adjust_counts, rebuild_request_stats, request_counts
+
+
+def _stored(service_id):
+    return db.session.get(ServiceRequestStats, service_id)
+
+
+def test_upsert_creates_and_adds(make_service):
+    service = make_service('PCR')
+    adjust_counts(service.service_id, pending=2)
+    adjust_counts(service.service_id, pending=-1, responded=1)
+    db.session.commit()
+    assert request_counts([service.service_id]) == {service.service_id: (1, 1, 0)}
+
+
+# A decrement that arrives before the row exists starts it at zero
+def test_row_created_by_a_decrement_is_clamped(make_service):
+    service = make_service('PCR')
+    adjust_counts(service.service_id, pending=-1, responded=1)
+    db.session.commit()
+    stats = _stored(service.service_id)
+    assert (stats.pending, stats.responded, stats.rejected) == (0, 1, 0)
+
+
+def test_counts_follow_requests_and_responses(client, make_service, submit_request):
+    service = make_service('PCR')
+    for _ in range(3):
+        assert submit_request(service.service_id).status_code == 302
+    assert request_counts([service.service_id]) == {service.service_id: (3, 0, 0)}
+
+    client.post('/supplier/respond/1', data={"response_details": 'Booked for Monday', "price": '120'})
+    client.post('/supplier/respond/2', data={"reject": '1'})
+    # Answering the same request again doesn't count it twice
+    client.post('/supplier/respond/1', data={"response_details": 'Moved to Tuesday', "price": '120'})
+    assert request_counts([service.service_id]) == {service.service_id: (1, 1, 1)}
+
+
+def test_reconcile_repairs_drift(make_service, submit_request):
+    drifted, exact = make_service('PCR'), make_service('Mass spectrometry')
+    submit_request(drifted.service_id)
+    submit_request(drifted.service_id)
+    submit_request(exact.service_id)
+    _stored(drifted.service_id).pending = 7
+    db.session.commit()
+
+    report = rebuild_request_stats()
+    assert report == {"services": 2, "drifted": 1}
+    assert request_counts([drifted.service_id, exact.service_id]) == {
+        drifted.service_id: (2, 0, 0),
+        exact.service_id: (1, 0, 0),
+    }
+    assert db.session.scalars(select(ServiceRequestStats.service_id)).all() == [drifted.service_id, exact.service_id]
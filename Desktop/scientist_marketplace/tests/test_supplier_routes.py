@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+from app.extensions import db
+from app.models import ServiceRequest, SupplierService
+from app.request_stats import request_counts
+
+
+@pytest.mark.parametrize('body', [
+    [1, 2],
+    'service_ids',
+    {"service_ids": 1},
+    {"service_ids": '1,2'},
+    {"service_ids": ['one']},
+    {"service_ids": [1.5]},
+    {"service_ids": [True]},
+    {"service_ids": []},
+    {},
+])
+def test_bulk_delete_rejects_malformed_bodies(client, make_service, body):
+    service = make_service('PCR')
+    response = client.post('/supplier/delete_bulk', json=body)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+    assert db.session.get(SupplierService, service.service_id) is not None
+
+
+def test_bulk_delete_removes_services_and_their_requests(client, make_service, submit_request):
+    doomed, kept = make_service('PCR').service_id, make_service('Mass spectrometry').service_id
+    submit_request(doomed)
+    submit_request(doomed)
+    submit_request(kept)
+    client.post('/supplier/respond/1', data={"response_details": 'Booked', "price": '10'})
+
+    response = client.post('/supplier/delete_bulk', json={"service_ids": [doomed, str(doomed), 999]})
+    assert response.status_code == 200
+    assert response.get_json()["deleted"] == {"services": 1, "requests": 2, "responses": 1}
+
+    db.session.expire_all()
+    assert db.session.get(SupplierService, doomed) is None
+    assert db.session.query(ServiceRequest).count() == 1
+    assert request_counts([doomed, kept]) == {kept: (1, 0, 0)}
+
+
+def test_bulk_delete_from_the_dashboard_form(client, make_service):
+    service_id = make_service('PCR').service_id
+    response = client.post('/supplier/delete_bulk', data={"service_ids": [str(service_id)]})
+    assert response.status_code == 302
+    db.session.expire_all()
+    assert db.session.get(SupplierService, service_id) is None
+
+
+@pytest.mark.parametrize('query', [
+    'format=xml',
+    'service_id=abc',
+    'service_id=',
+    'since=yesterday',
+    'until=2024-13-01',
+])
+def test_export_rejects_malformed_parameters(client, query):
+    response = client.get(f'/supplier/export/requests?{query}')
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+def test_export_filters_by_service(client, make_service, submit_request):
+    first, second = make_service('PCR'), make_service('Mass spectrometry')
+    submit_request(first.service_id, email='a@example.org')
+    submit_request(second.service_id, email='b@example.org')
+
+    response = client.get(f'/supplier/export/requests?format=jsonl&service_id={second.service_id}')
+    assert response.status_code == 200
+    assert f'service_requests_{second.service_id}.jsonl' in response.headers['Content-Disposition']
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [row["email"] for row in rows] == ['b@example.org']